@@ -141,6 +141,10 @@ class Memory():
     def read(self, addr):
         return self._cells[addr]
 
+    ## copia (en bloque) las celdas [src, src + size) a partir de dst, aunque se superpongan
+    def moveBlock(self, src, dst, size):
+        self._cells[dst:dst + size] = self._cells[src:src + size]
+
     @property
     def size(self):
         return self._size
@@ -4,6 +4,7 @@ from hardware import *
 import log
 from enum import Enum
 from collections import deque
+from bisect import bisect_left, insort
 
 TICKSTOAGE = 4
 
@@ -267,24 +268,8 @@ class PCBTable():
         self._incrVal += 1
         return self._incrVal
     
-    def compact(self):
-        interruptedPCB = self.kernel.runningPCB
-        self.kernel.dispatcher.save(self.kernel.runningPCB)
-        interruptedPCB.state = State.READY
-
-        pcbList = list(self._table.values())
-        sortedTable = sorted(pcbList, key=lambda pcb: pcb.baseDir)
-        offset = 0
-
-        for pcb in sortedTable:
-            displacement = pcb.baseDir - offset
-            pcb.baseDir -= displacement
-            pcb.pc -= displacement
-            pcb.limitDir -= displacement
-            offset = pcb.limitDir + 1
-
-        self.kernel.dispatcher.load(interruptedPCB)
-        interruptedPCB.state = State.RUNNING
+    def getPCBs(self):
+        return self._table.values()
 
     @property
     def kernel(self):
@@ -447,79 +432,178 @@ class MemoryManager():
     def __init__(self, memorySize, kernel, algorithm):
         self._kernel = kernel
         self._memorySize = memorySize
-        self._freeBlocks = [[0, memorySize - 1]]
+        self._freeBlocks = FreeBlocks(memorySize)
         self._freeSize = memorySize
         self._algorithm = algorithm
+        self._compactions = 0
+        self._movedCells = 0
 
     def getFreeBlock(self, size):
         if (size > self._freeSize):
             log.logger.error("Not enough free memory for the requested size (Size = {size}, Free = {memory})".format(size = size, memory = self._freeSize))
             return -1
         elif (self._mustCompact(size)):
-            self._compact()
+            self._compact(size)
         self._freeSize -= size
-        return self._algorithm.findBlock(self._freeBlocks, size)[0]
+        return self._algorithm.findBlock(self._freeBlocks, size)
     
     def freeBlock(self, baseDir, size):
-        self._freeBlocks.append([baseDir, baseDir + size - 1])
-        self._freeBlocks.sort(key = lambda b : b[0])
+        ## FreeBlocks combina el bloque con los bloques libres continuos
+        self._freeBlocks.add(baseDir, baseDir + size - 1)
         self._freeSize += size
-        index = 0
-        while(index < len(self._freeBlocks) and self._freeBlocks[index][0] != baseDir):
-            index += 1
-        if (index > 0 and self._freeBlocks[index - 1][1] == self._freeBlocks[index][0] - 1):
-            # Si el bloque anterior es continuo al que agregué, combinarlos
-            self._freeBlocks[index][0] = self._freeBlocks[index - 1][0]
-            self._freeBlocks.pop(index - 1)
-            index -= 1
-        if (index + 1 < len(self._freeBlocks) and self._freeBlocks[index + 1][0] == self._freeBlocks[index][1] + 1):
-            # Si el bloque siguiente es continuo al que agregué, combinarlos
-            self._freeBlocks[index][1] = self._freeBlocks[index + 1][1]
-            self._freeBlocks.pop(index + 1)
 
     def newBlock(self, baseDir, limitDir):
-        block = next((b for b in self._freeBlocks if b[0] == baseDir), None)
-        if(block[1] == limitDir):
-            self._freeBlocks.remove(block)
-        else:
-            block[0] = limitDir + 1
+        self._freeBlocks.take(baseDir, limitDir - baseDir + 1)
 
     def _mustCompact(self, size):
-        return not self._algorithm.findBlock(self._freeBlocks, size)
+        return self._algorithm.findBlock(self._freeBlocks, size) is None
     
-    def _compact(self):
-        self.kernel.pcbTable.compact()
-        self._freeBlocks.clear()
-        self._freeBlocks.append([self._memorySize - self._freeSize, self._memorySize - 1])
+    ## compactacion parcial: en lugar de mover todos los procesos, busca la ventana de bloques
+    ## libres consecutivos (H_i .. H_j) que suma al menos `size` y que tiene la menor cantidad
+    ## de celdas ocupadas entre ellos, y corre solo esos procesos hacia el comienzo de la ventana.
+    ## Asi todo el espacio libre de la ventana queda en un unico bloque al final
+    def _compact(self, size):
+        holes = list(self._freeBlocks)
+        freeBefore = [0]    # espacio libre en los bloques libres 0 .. k-1
+        usedBefore = [0]    # celdas ocupadas entre los bloques libres 0 .. k
+        for index, (start, end) in enumerate(holes):
+            freeBefore.append(freeBefore[-1] + end - start + 1)
+            if (index + 1 < len(holes)):
+                usedBefore.append(usedBefore[-1] + holes[index + 1][0] - end - 1)
+        best = None
+        for first in range(len(holes)):
+            ## el primer bloque libre `last` con el que la ventana alcanza `size`
+            last = bisect_left(freeBefore, freeBefore[first] + size) - 1
+            if (last >= len(holes)):
+                break
+            cost = usedBefore[last] - usedBefore[first]
+            if (best is None or cost < best[0]):
+                best = (cost, first, last)
+        cost, first, last = best
+        self._moveProcesses(holes[first][0], holes[first][1], holes[last][0])
+        for start, end in holes[first:last + 1]:
+            self._freeBlocks.remove(start)
+        self._freeBlocks.add(holes[last][1] - (freeBefore[last + 1] - freeBefore[first]) + 1, holes[last][1])
+        self._compactions += 1
+        self._movedCells += cost
+        log.logger.info("Compaction #{n}: moved {cells} cells to make room for {size} (total moved: {total})".format(n = self._compactions, cells = cost, size = size, total = self._movedCells))
+
+    ## mueve los procesos que estan entre firstFreeEnd y lastFreeStart para que empiecen en baseDir
+    def _moveProcesses(self, baseDir, firstFreeEnd, lastFreeStart):
+        pcbs = [pcb for pcb in self.kernel.pcbTable.getPCBs()
+                if pcb.state != State.TERMINATED and firstFreeEnd < pcb.baseDir < lastFreeStart]
+        for pcb in sorted(pcbs, key=lambda pcb: pcb.baseDir):
+            size = pcb.limitDir - pcb.baseDir + 1
+            HARDWARE.memory.moveBlock(pcb.baseDir, baseDir, size)
+            pcb.baseDir = baseDir
+            pcb.limitDir = baseDir + size - 1
+            ## el pc es una direccion logica, no cambia; si el proceso esta en CPU se actualiza el MMU
+            if (pcb is self.kernel.runningPCB):
+                HARDWARE.mmu.baseDir = baseDir
+            baseDir += size
+
+    @property
+    def compactions(self):
+        return self._compactions
+
+    ## cantidad total de celdas movidas por las compactaciones
+    @property
+    def movedCells(self):
+        return self._movedCells
 
     @property
     def kernel(self):
         return self._kernel
 
+## bloques libres de la memoria, indexados de dos formas:
+##  - por direccion (_starts ordenado + _ends: inicio -> fin), para combinar un bloque
+##    liberado con sus vecinos y para first fit
+##  - por tamaño (_bySize: pares (tamaño, inicio) ordenados), para best fit y worst fit
+## las busquedas son binarias (bisect)
+class FreeBlocks():
+
+    def __init__(self, memorySize, firstFreeDir = 0):
+        self._starts = []
+        self._ends = {}
+        self._bySize = []
+        if (firstFreeDir < memorySize):
+            self._insert(firstFreeDir, memorySize - 1)
+
+    def _insert(self, start, end):
+        insort(self._starts, start)
+        self._ends[start] = end
+        insort(self._bySize, (end - start + 1, start))
+
+    def _remove(self, start):
+        end = self._ends.pop(start)
+        del self._starts[bisect_left(self._starts, start)]
+        del self._bySize[bisect_left(self._bySize, (end - start + 1, start))]
+        return end
+
+    ## agrega un bloque libre, combinandolo con el anterior y el siguiente si son continuos
+    def add(self, start, end):
+        index = bisect_left(self._starts, start)
+        if (index > 0):
+            previous = self._starts[index - 1]
+            if (self._ends[previous] == start - 1):
+                # Si el bloque anterior es continuo al que agregué, combinarlos
+                self._remove(previous)
+                start = previous
+        if (end + 1 in self._ends):
+            # Si el bloque siguiente es continuo al que agregué, combinarlos
+            end = self._remove(end + 1)
+        self._insert(start, end)
+
+    def remove(self, start):
+        self._remove(start)
+
+    ## ocupa los primeros `size` lugares del bloque libre que empieza en start
+    def take(self, start, size):
+        end = self._remove(start)
+        if (start + size <= end):
+            self._insert(start + size, end)
+
+    def firstFit(self, size):
+        return next((start for start in self._starts if size <= self._ends[start] - start + 1), None)
+
+    ## el bloque mas chico donde entra `size` (a igual tamaño, el de menor direccion)
+    def bestFit(self, size):
+        index = bisect_left(self._bySize, (size, -1))
+        return self._bySize[index][1] if index < len(self._bySize) else None
+
+    ## el bloque mas grande (a igual tamaño, el de menor direccion)
+    def worstFit(self, size):
+        if not self._bySize or self._bySize[-1][0] < size:
+            return None
+        index = bisect_left(self._bySize, (self._bySize[-1][0], -1))
+        return self._bySize[index][1]
+
+    def __iter__(self):
+        return ([start, self._ends[start]] for start in self._starts)
+
+    def __len__(self):
+        return len(self._starts)
+
 class ContinuousMemoryAlgorithm():
-    
-    def _blockSize(self, block):
-        return block[1] - block[0] + 1
-    
-    def findBlock(self, blocks, size):
+
+    ## retorna la direccion base del bloque elegido, o None si no hay ninguno donde entre `size`
+    def findBlock(self, freeBlocks, size):
         pass
 
 class FirstFitAlgorithm(ContinuousMemoryAlgorithm):
     
-    def findBlock(self, blocks, size):
-        return next((b for b in blocks if size <= self._blockSize(b)), None)
+    def findBlock(self, freeBlocks, size):
+        return freeBlocks.firstFit(size)
 
 class WorstFitAlgorithm(ContinuousMemoryAlgorithm):
 
-    def findBlock(self, blocks, size):
-        candidates = filter(lambda b: size <= self._blockSize(b), blocks)
-        return max(candidates) if candidates else None
+    def findBlock(self, freeBlocks, size):
+        return freeBlocks.worstFit(size)
 
 class BestFitAlgorithm(ContinuousMemoryAlgorithm):
 
-    def findBlock(self, blocks, size):
-        candidates = list(filter(lambda b: size <= self._blockSize(b), blocks))
-        return min(candidates) if candidates else None
+    def findBlock(self, freeBlocks, size):
+        return freeBlocks.bestFit(size)
 
 # emulates the core of an Operative System
 class Kernel():
@@ -0,0 +1,51 @@
+from hardware import *
+from so import *
+from timeit import timeit
+import log
+
+
+## costo de un cambio de contexto (Dispatcher.save + Dispatcher.load) segun el tamaño del proceso.
+## "ptbr" es el Dispatcher actual, que solo cambia el registro base de la tabla de paginas del MMU;
+## "refill" recarga la TLB pagina por pagina como lo hacia antes el Dispatcher
+PAGES_QUANTITIES = [1, 16, 256, 4096, 65536]
+SWITCHES = 1000
+## recargar una tabla grande es lento, asi que se mide con menos cambios de contexto
+REFILL_SWITCHES = 10
+
+
+def loadedPCB(pid, pagesQuantity):
+    pageTable = PageTable(pagesQuantity)
+    for pageId in range(pagesQuantity):
+        entry = pageTable.entry(pageId)
+        entry.frame = pageId
+        entry.valid = True
+    return PCB(pid, "C:/prg{pid}.exe".format(pid=pid), 0, pageTable)
+
+
+def refillSwitch(dispatcher, pcb):
+    dispatcher.save(pcb)
+    dispatcher.load(pcb)
+    tlb = dict()
+    for pageId, entry in pcb.pageTable.validPages():
+        tlb[pageId] = entry.frame
+
+
+def ptbrSwitch(dispatcher, pcb):
+    dispatcher.save(pcb)
+    dispatcher.load(pcb)
+
+
+if __name__ == '__main__':
+    log.setupLogger(logging.WARNING)
+    HARDWARE.setup(16)
+    HARDWARE.mmu.frameSize = 4
+    dispatcher = Dispatcher(HARDWARE)
+
+    rows = []
+    for pagesQuantity in PAGES_QUANTITIES:
+        pcb = loadedPCB(len(rows), pagesQuantity)
+        ptbr = timeit(lambda: ptbrSwitch(dispatcher, pcb), number=SWITCHES) / SWITCHES
+        refill = timeit(lambda: refillSwitch(dispatcher, pcb), number=REFILL_SWITCHES) / REFILL_SWITCHES
+        rows.append([pagesQuantity, ptbr * 1e6, refill * 1e6])
+
+    print(tabulate(rows, headers=['pages', 'ptbr switch (us)', 'refill switch (us)'], tablefmt="grid", floatfmt=".2f"))
@@ -2,13 +2,86 @@
 
 from tabulate import tabulate
 from time import sleep
-from threading import Thread, Lock
+from threading import Thread
+from collections import deque
+from heapq import heappush, heappop
+from itertools import count
 import log
+import logging
 
 ##  Estas son la instrucciones soportadas por nuestro CPU
-INSTRUCTION_IO = 'IO'
-INSTRUCTION_CPU = 'CPU'
-INSTRUCTION_EXIT = 'EXIT'
+##  se codifican como opcodes de un byte, asi la memoria y los programas se guardan en bytearrays
+INSTRUCTION_EMPTY = 0   # celda de memoria sin inicializar
+INSTRUCTION_IO = 1      # IO en la impresora
+INSTRUCTION_CPU = 2
+INSTRUCTION_EXIT = 3
+INSTRUCTION_IO_DISK = 4
+INSTRUCTION_IO_NETWORK = 5
+INSTRUCTION_WRITE = 6   # como CPU, pero ademas escribe en la memoria del proceso (deja la pagina modificada)
+
+INSTRUCTION_NAMES = {
+    INSTRUCTION_EMPTY: '',
+    INSTRUCTION_IO: 'IO',
+    INSTRUCTION_CPU: 'CPU',
+    INSTRUCTION_EXIT: 'EXIT',
+    INSTRUCTION_IO_DISK: 'IO_DISK',
+    INSTRUCTION_IO_NETWORK: 'IO_NETWORK',
+    INSTRUCTION_WRITE: 'WRITE',
+}
+## nombre -> opcode (para leer programas escritos como texto)
+INSTRUCTION_OPCODES = {name: opcode for opcode, name in INSTRUCTION_NAMES.items() if name}
+
+##  Los dispositivos de IO, y la instruccion de IO de cada uno
+PRINTER_DEVICE_ID = "Printer"
+DISK_DEVICE_ID = "Disk"
+NETWORK_DEVICE_ID = "Network"
+
+IO_DEVICE_IDS = {
+    INSTRUCTION_IO: PRINTER_DEVICE_ID,
+    INSTRUCTION_IO_DISK: DISK_DEVICE_ID,
+    INSTRUCTION_IO_NETWORK: NETWORK_DEVICE_ID,
+}
+IO_INSTRUCTIONS = {deviceId: opcode for opcode, deviceId in IO_DEVICE_IDS.items()}
+
+## los demas dispositivos reciben un opcode libre al conectarse con Hardware.addIoDevice,
+## con el nombre IO_<DEVICEID>. Todas las maquinas comparten la asignacion
+def registerIoDevice(deviceId):
+    opcode = IO_INSTRUCTIONS.get(deviceId)
+    if opcode is None:
+        opcode = max(INSTRUCTION_NAMES) + 1
+        name = "IO_{deviceId}".format(deviceId=deviceId).upper()
+        if opcode > 255:
+            raise Exception("There's no free opcode for IO device {id}".format(id = deviceId))
+        if name in INSTRUCTION_OPCODES:
+            raise Exception("Instruction {name} already exists, can't register IO device {id}".format(name = name, id = deviceId))
+        INSTRUCTION_NAMES[opcode] = name
+        INSTRUCTION_OPCODES[name] = opcode
+        IO_DEVICE_IDS[opcode] = deviceId
+        IO_INSTRUCTIONS[deviceId] = opcode
+    return opcode
+
+DISK_CYLINDERS = 200
+DISK_CYLINDERS_PER_TICK = 50
+
+
+## a run of `count` consecutive copies of the same instruction (i.e. ASM.CPU(3))
+## se guarda como el par (opcode, count) en lugar de expandirlo
+class InstructionRun():
+
+    def __init__(self, opcode, count):
+        self._opcode = opcode
+        self._count = count
+
+    @property
+    def opcode(self):
+        return self._opcode
+
+    @property
+    def count(self):
+        return self._count
+
+    def __repr__(self):
+        return "{name}*{count}".format(name=ASM.decode(self._opcode), count=self._count)
 
 
 ## Helper for emulated machine code
@@ -16,23 +89,51 @@ class ASM():
 
     @classmethod
     def EXIT(self, times):
-        return [INSTRUCTION_EXIT] * times
+        return InstructionRun(INSTRUCTION_EXIT, times)
 
+    ## IO en el dispositivo indicado (por defecto la impresora), que ya tiene que estar
+    ## conectado (Hardware.addIoDevice) en alguna maquina
     @classmethod
-    def IO(self):
-        return INSTRUCTION_IO
+    def IO(self, deviceId = PRINTER_DEVICE_ID):
+        opcode = IO_INSTRUCTIONS.get(deviceId)
+        if opcode is None:
+            raise Exception("Unknown IO device {id}, connect it with Hardware.addIoDevice first".format(id = deviceId))
+        return opcode
 
     @classmethod
     def CPU(self, times):
-        return [INSTRUCTION_CPU] * times
+        return InstructionRun(INSTRUCTION_CPU, times)
+
+    @classmethod
+    def WRITE(self, times):
+        return InstructionRun(INSTRUCTION_WRITE, times)
 
     @classmethod
     def isEXIT(self, instruction):
         return INSTRUCTION_EXIT == instruction
 
+    @classmethod
+    def isWRITE(self, instruction):
+        return INSTRUCTION_WRITE == instruction
+
     @classmethod
     def isIO(self, instruction):
-        return INSTRUCTION_IO == instruction
+        return instruction in IO_DEVICE_IDS
+
+    ## el dispositivo de una instruccion de IO
+    @classmethod
+    def ioDevice(self, instruction):
+        return IO_DEVICE_IDS[instruction]
+
+    ## opcode -> nombre legible de la instruccion ('CPU', 'IO', 'IO_DISK', 'EXIT', ...)
+    @classmethod
+    def decode(self, instruction):
+        return INSTRUCTION_NAMES.get(instruction, instruction)
+
+    ## nombre -> opcode: el inverso de decode
+    @classmethod
+    def encode(self, name):
+        return INSTRUCTION_OPCODES[name]
 
 
 ##  Estas son la interrupciones soportadas por nuestro Kernel
@@ -41,14 +142,36 @@ IO_IN_INTERRUPTION_TYPE = "#IO_IN"
 IO_OUT_INTERRUPTION_TYPE = "#IO_OUT"
 NEW_INTERRUPTION_TYPE = "#NEW"
 TIMEOUT_INTERRUPTION_TYPE = "#TIMEOUT"
-STAT_INTERRUPTION_TYPE = "#STAT"
+PAGE_FAULT_INTERRUPTION_TYPE = "#PAGE_FAULT"
+## interrupcion entre procesadores: el kernel le pide a un core libre que busque un proceso para correr
+RESCHEDULE_INTERRUPTION_TYPE = "#RESCHEDULE"
+
+## prioridad de cada interrupcion (menor numero = mas urgente). Un handler solo puede ser
+## interrumpido por una IRQ mas urgente que la suya; las demas quedan pendientes hasta que termine
+IRQ_PRIORITIES = {
+    PAGE_FAULT_INTERRUPTION_TYPE: 0,
+    KILL_INTERRUPTION_TYPE: 1,
+    IO_IN_INTERRUPTION_TYPE: 1,
+    TIMEOUT_INTERRUPTION_TYPE: 2,
+    RESCHEDULE_INTERRUPTION_TYPE: 2,
+    IO_OUT_INTERRUPTION_TYPE: 3,
+    NEW_INTERRUPTION_TYPE: 4,
+}
+DEFAULT_IRQ_PRIORITY = 5
+
+## politicas de reemplazo de la TLB
+TLB_FIFO_POLICY = "FIFO"
+TLB_LRU_POLICY = "LRU"
+TLB_SIZE = 16
 
 ## emulates an Interrupt request
+## coreId: el core que genero la IRQ (None si no la genero un core, por ejemplo un dispositivo)
 class IRQ:
 
-    def __init__(self, type, parameters = None):
+    def __init__(self, type, parameters = None, coreId = None):
         self._type = type
         self._parameters = parameters
+        self._coreId = coreId
 
     @property
     def parameters(self):
@@ -58,105 +181,488 @@ class IRQ:
     def type(self):
         return self._type
 
+    @property
+    def coreId(self):
+        return self._coreId
 
-## emulates the Interrupt Vector Table
+
+## emulates the Interrupt Vector Table (y el controlador de interrupciones)
+## Las IRQs se despachan en el momento, salvo que esten enmascaradas o que haya un handler en curso
+## de igual o mayor prioridad: esas quedan pendientes y se entregan cuando se desenmascaran, cuando
+## termina el handler que las bloqueaba, o a mas tardar al comienzo del proximo tick (es subscriber del Clock).
+## Lo usa un solo thread (el del Clock, o el programa antes de encenderlo), asi que no necesita locks
 class InterruptVector():
 
     def __init__(self):
-        self._handlers = dict()
-        self.lock = Lock()
+        ## tipo -> (handler, prioridad), asi despachar es un solo lookup
+        self._vector = dict()
+        self._priorities = dict(IRQ_PRIORITIES)
+        ## heap de (prioridad, llegada, irq) de las IRQs pendientes habilitadas
+        self._pending = []
+        self._arrivals = count()
+        ## tipo -> IRQs pendientes de un tipo enmascarado, en orden de llegada
+        self._masked = dict()
+        ## prioridad del handler en curso (None si no se esta atendiendo ninguna IRQ)
+        self._currentPriority = None
+
+    def register(self, interruptionType, interruptionHandler, priority = None):
+        if priority is not None:
+            self._priorities[interruptionType] = priority
+        self._vector[interruptionType] = (interruptionHandler, self.priority(interruptionType))
+
+    def priority(self, interruptionType):
+        return self._priorities.get(interruptionType, DEFAULT_IRQ_PRIORITY)
+
+    def mask(self, interruptionType):
+        self._masked.setdefault(interruptionType, deque())
+
+    ## las IRQs que llegaron mientras estaba enmascarada pasan a estar pendientes
+    def unmask(self, interruptionType):
+        for irq in self._masked.pop(interruptionType, ()):
+            heappush(self._pending, (self.priority(irq.type), next(self._arrivals), irq))
+        self._drain()
+
+    def isMasked(self, interruptionType):
+        return interruptionType in self._masked
 
-    def register(self, interruptionType, interruptionHandler):
-        self._handlers[interruptionType] = interruptionHandler
+    @property
+    def pendingCount(self):
+        return len(self._pending) + sum(len(irqs) for irqs in self._masked.values())
 
     def handle(self, irq):
-        log.logger.info("Handling {type} irq with parameters = {parameters}".format(type=irq.type, parameters=irq.parameters ))
-        self.lock.acquire()
+        irqType = irq.type
+        if self._masked and irqType in self._masked:
+            log.irq.debug("Masked %s irq, pending", irqType)
+            self._masked[irqType].append(irq)
+            return
+        entry = self._vector.get(irqType)
+        if entry is None:
+            log.irq.info("No Handler found for irq type: %s", irqType)
+            return
+        if self._currentPriority is not None and entry[1] >= self._currentPriority:
+            log.irq.debug("%s irq pending while handling an irq of priority %s", irqType, self._currentPriority)
+            heappush(self._pending, (entry[1], next(self._arrivals), irq))
+            return
+        self._dispatch(irq, entry)
+
+    def _dispatch(self, irq, entry):
+        irqHandler, priority = entry
+        if log.irq.isEnabledFor(logging.INFO):
+            log.irq.info("Handling %s irq with parameters = %s", irq.type, irq.parameters)
+        interruptedPriority = self._currentPriority
+        self._currentPriority = priority
         try:
-            irqHandler = self._handlers[irq.type]
-        except:
-           irqHandler = None
-           log.logger.info("No Handler found for irq type: {type}".format(type=irq.type ))
-
-        if not (irqHandler is None):
             irqHandler.execute(irq)
-        self.lock.release()
+        finally:
+            ## aunque el handler falle, el vector queda listo para la proxima IRQ
+            self._currentPriority = interruptedPriority
+        if self._pending:
+            self._drain()
+
+    ## entrega las IRQs pendientes que ya pueden atenderse, de la mas urgente a la menos urgente
+    def _drain(self):
+        while self._pending and (self._currentPriority is None or self._pending[0][0] < self._currentPriority):
+            _, _, irq = heappop(self._pending)
+            entry = self._vector.get(irq.type)
+            if entry is not None:
+                self._dispatch(irq, entry)
+
+    ## al comienzo de cada tick se entregan las IRQs que quedaron pendientes
+    def tick(self, tickNbr):
+        if self._pending:
+            self._drain()
+
+    def nextEventTick(self, tickNbr):
+        return tickNbr if self._pending else None
 
+    def skipTicks(self, fromTick, count):
+        pass
+
+
+## velocidades del Clock (en ticks por segundo)
+## REAL_TIME_CLOCK_RATE: un tick por segundo (el comportamiento original)
+## FAST_FORWARD_CLOCK_RATE: sin esperas entre ticks, "tan rapido como se pueda"
+REAL_TIME_CLOCK_RATE = 1
+FAST_FORWARD_CLOCK_RATE = None
 
 ## emulates the Internal Clock
 class Clock():
 
-    def __init__(self):
+    def __init__(self, ticksPerSecond = REAL_TIME_CLOCK_RATE):
         self._subscribers = []
         self._running = False
         self._currentTick = 0
+        self._ticksPerSecond = ticksPerSecond
+        self._stopCondition = None
+        self._thread = None
+        self._stopListeners = []
 
     def addSubscriber(self, subscriber):
         self._subscribers.append(subscriber)
 
+    ## funciones sin parametros que se llaman cuando el clock deja de correr
+    ## (por stop, por stopCondition, o porque un subscriber lanzo una excepcion)
+    def addStopListener(self, stopListener):
+        self._stopListeners.append(stopListener)
+
     def stop(self):
         self._running = False
 
     def start(self):
+        if self._ticksPerSecond is FAST_FORWARD_CLOCK_RATE and self._stopCondition is None:
+            raise Exception("A fast-forward Clock needs a stopCondition, it would never stop")
         if not self._running:
-            log.logger.info("---- :::: START CLOCK  ::: -----")
+            log.clock.info("---- :::: START CLOCK  ::: -----")
             self._running = True
-            t = Thread(target=self.__start)
-            t.start()
+            self._thread = Thread(target=self._run)
+            self._thread.start()
+
+    ## espera (bloqueando) a que el clock se detenga
+    def join(self):
+        if self._thread:
+            self._thread.join()
 
-    def __start(self):
+    def _run(self):
+        try:
+            self._runTicks()
+        finally:
+            self._stopped()
+
+    def _runTicks(self):
         tickNbr = 0
         while (self._running):
             self.tick(tickNbr)
             tickNbr += 1
+            if self._mustStop():
+                log.clock.info("---- :::: STOP CLOCK at tick: %s ::: -----", tickNbr - 1)
+                self._running = False
+
+    def _stopped(self):
+        self._running = False
+        for stopListener in self._stopListeners:
+            stopListener()
 
     def tick(self, tickNbr):
         self._currentTick = tickNbr
-        log.logger.info("        --------------- tick: {tickNbr} ---------------".format(tickNbr = tickNbr))
+        log.clock.info("        --------------- tick: %s ---------------", tickNbr)
         ## notify all subscriber that a new clock cycle has started
         for subscriber in self._subscribers:
             subscriber.tick(tickNbr)
-        ## wait 1 second and keep looping
-        sleep(1)
+        ## wait (depending on the clock rate) and keep looping
+        self._wait()
 
     def do_ticks(self, times):
-        log.logger.info("---- :::: CLOCK do_ticks: {times} ::: -----".format(times=times))
+        log.clock.info("---- :::: CLOCK do_ticks: %s ::: -----", times)
         for tickNbr in range(0, times):
             self.tick(tickNbr)
 
+    def _wait(self):
+        if self._ticksPerSecond:
+            sleep(1 / self._ticksPerSecond)
+
+    def _mustStop(self):
+        return self._stopCondition is not None and self._stopCondition()
+
     @property
     def currentTick(self):
         return self._currentTick
 
+    @property
+    def ticksPerSecond(self):
+        return self._ticksPerSecond
+
+    ## ticksPerSecond = FAST_FORWARD_CLOCK_RATE (None) desactiva las esperas entre ticks
+    @ticksPerSecond.setter
+    def ticksPerSecond(self, ticksPerSecond):
+        self._ticksPerSecond = ticksPerSecond
+
+    @property
+    def stopCondition(self):
+        return self._stopCondition
+
+    ## funcion sin parametros que se evalua luego de cada tick,
+    ## cuando retorna True el clock se detiene
+    @stopCondition.setter
+    def stopCondition(self, stopCondition):
+        self._stopCondition = stopCondition
+
+## emulates a discrete-event Clock
+## en lugar de notificar cada tick, le pregunta a sus subscribers cual es el proximo tick
+## "interesante" (nextEventTick) y salta directamente a el, avisandoles cuantos ticks
+## sin actividad se saltearon (skipTicks). El resultado es el mismo que tick a tick,
+## pero el costo depende de la cantidad de eventos y no de la cantidad de ticks.
+## Los subscribers que no implementan nextEventTick se consideran interesados en todos los ticks
+class EventDrivenClock(Clock):
+
+    def _runTicks(self):
+        tickNbr = 0
+        while (self._running):
+            nextTick = self._nextEventTick(tickNbr)
+            if nextTick is None:
+                ## no quedan eventos pendientes: un ultimo tick (para cerrar las estadisticas) y se detiene
+                self.tick(tickNbr)
+                log.clock.info("---- :::: NO MORE EVENTS, STOP CLOCK at tick: %s ::: -----", tickNbr)
+                self._running = False
+            else:
+                self._skipTicks(tickNbr, nextTick - tickNbr)
+                self.tick(nextTick)
+                tickNbr = nextTick + 1
+                if self._mustStop():
+                    log.clock.info("---- :::: STOP CLOCK at tick: %s ::: -----", nextTick)
+                    self._running = False
+
+    def do_ticks(self, times):
+        log.clock.info("---- :::: CLOCK do_ticks: %s ::: -----", times)
+        tickNbr = 0
+        while (tickNbr < times):
+            nextTick = self._nextEventTick(tickNbr)
+            if nextTick is None or nextTick >= times:
+                self._skipTicks(tickNbr, times - tickNbr)
+                tickNbr = times
+            else:
+                self._skipTicks(tickNbr, nextTick - tickNbr)
+                self.tick(nextTick)
+                tickNbr = nextTick + 1
+
+    def _nextEventTick(self, tickNbr):
+        ## el subscriber con el evento mas cercano define el proximo tick
+        nextTicks = [self._subscriberNextEventTick(subscriber, tickNbr) for subscriber in self._subscribers]
+        pendingTicks = [nextTick for nextTick in nextTicks if nextTick is not None]
+        return min(pendingTicks) if pendingTicks else None
+
+    def _subscriberNextEventTick(self, subscriber, tickNbr):
+        if hasattr(subscriber, 'nextEventTick'):
+            return subscriber.nextEventTick(tickNbr)
+        return tickNbr
+
+    def _skipTicks(self, fromTick, count):
+        if count > 0:
+            self._currentTick = fromTick
+            for subscriber in self._subscribers:
+                if hasattr(subscriber, 'skipTicks'):
+                    subscriber.skipTicks(fromTick, count)
+
 ## emulates the main memory (RAM)
 class Memory():
 
     def __init__(self, size):
         self._size = size
-        self._cells = [''] * size
+        ## una celda = un opcode de un byte
+        self._cells = bytearray(size)
 
     def write(self, addr, value):
         self._cells[addr] = value
 
+    ## escribe un bloque de opcodes consecutivos a partir de addr
+    def writeBlock(self, addr, values):
+        self._cells[addr:addr + len(values)] = values
+
     def read(self, addr):
         return self._cells[addr]
 
+    ## copia de un bloque de opcodes consecutivos a partir de addr
+    def readBlock(self, addr, size):
+        return self._cells[addr:addr + size]
+
     @property
     def size(self):
         return self._size
 
     def __repr__(self):
-        return tabulate(enumerate(self._cells), tablefmt='psql')
+        return tabulate(enumerate(ASM.decode(cell) for cell in self._cells), tablefmt='psql')
         ##return "Memoria = {mem}".format(mem=self._cells)
 
+## entrada de la tabla de paginas: en que frame esta la pagina y si es valida (esta cargada en memoria).
+## El MMU marca los bits referenced/dirty y el momento del ultimo acceso (para los algoritmos de reemplazo);
+## swapSlot es el lugar del area de swap donde quedo la pagina la ultima vez que se desalojo modificada
+class PageTableEntry():
+
+    def __init__(self):
+        self._frame = None
+        self._valid = False
+        self._referenced = False
+        self._dirty = False
+        self._lastReference = 0
+        self._swapSlot = None
+
+    @property
+    def frame(self):
+        return self._frame
+
+    @frame.setter
+    def frame(self, frame):
+        self._frame = frame
+
+    @property
+    def valid(self):
+        return self._valid
+
+    @valid.setter
+    def valid(self, valid):
+        self._valid = valid
+
+    @property
+    def referenced(self):
+        return self._referenced
+
+    @referenced.setter
+    def referenced(self, referenced):
+        self._referenced = referenced
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    @dirty.setter
+    def dirty(self, dirty):
+        self._dirty = dirty
+
+    @property
+    def lastReference(self):
+        return self._lastReference
+
+    @lastReference.setter
+    def lastReference(self, lastReference):
+        self._lastReference = lastReference
+
+    @property
+    def swapSlot(self):
+        return self._swapSlot
+
+    @swapSlot.setter
+    def swapSlot(self, swapSlot):
+        self._swapSlot = swapSlot
+
+
+## tabla de paginas de un proceso: solo se crean las entradas de las paginas que alguna vez se cargaron,
+## asi un programa mas grande que la memoria no necesita una entrada por cada una de sus paginas
+class PageTable():
+
+    def __init__(self, pagesQuantity):
+        self._pagesQuantity = pagesQuantity
+        self._entries = dict()
+
+    def get(self, pageId):
+        return self._entries.get(pageId)
+
+    def entry(self, pageId):
+        entry = self._entries.get(pageId)
+        if entry is None:
+            entry = PageTableEntry()
+            self._entries[pageId] = entry
+        return entry
+
+    ## (pageId, entry) de las paginas cargadas en memoria
+    def validPages(self):
+        return [(pageId, entry) for pageId, entry in self._entries.items() if entry.valid]
+
+    def frames(self):
+        return [entry.frame for entry in self._entries.values() if entry.valid]
+
+    ## todas las entradas creadas, esten o no cargadas en memoria
+    def entries(self):
+        return list(self._entries.values())
+
+    def __len__(self):
+        return self._pagesQuantity
+
+
+## Translation Lookaside Buffer: cache asociativa de tamaño fijo de entradas de la tabla de paginas.
+## Con asidTagging las entradas se guardan junto al ASID (el pid) del proceso, asi no hace falta
+## vaciarla en cada cambio de contexto; sin asidTagging el MMU la vacia cuando cambia el proceso
+class TLB():
+
+    def __init__(self, size = TLB_SIZE, policy = TLB_LRU_POLICY, asidTagging = False):
+        self._size = size
+        self._policy = policy
+        self._asidTagging = asidTagging
+        ## (asid, pageId) -> PageTableEntry, en orden de reemplazo (el primero es la victima)
+        self._entries = dict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def policy(self):
+        return self._policy
+
+    @property
+    def asidTagging(self):
+        return self._asidTagging
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def hitRatio(self):
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else 0
+
+    ## la entrada de la pagina si esta en la TLB (y sigue cargada en memoria), si no None
+    def lookup(self, asid, pageId):
+        key = (asid, pageId)
+        entry = self._entries.get(key)
+        if entry is None or not entry.valid:
+            self._misses += 1
+            return None
+        self._hits += 1
+        if self._policy == TLB_LRU_POLICY:
+            del self._entries[key]
+            self._entries[key] = entry
+        return entry
+
+    def insert(self, asid, pageId, entry):
+        key = (asid, pageId)
+        self._entries.pop(key, None)
+        if len(self._entries) >= self._size:
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = entry
+
+    def invalidate(self, asid, pageId):
+        self._entries.pop((asid, pageId), None)
+
+    ## vacia la TLB (o solo las entradas de un asid)
+    def flush(self, asid = None):
+        if asid is None:
+            self._entries = dict()
+        else:
+            for key in [key for key in self._entries if key[0] == asid]:
+                del self._entries[key]
+
+    ## tiempo promedio de acceso a memoria: un hit cuesta un acceso, un miss dos (tabla de paginas + dato)
+    def effectiveAccessTime(self, tlbTime, memoryTime):
+        return self.hitRatio * (tlbTime + memoryTime) + (1 - self.hitRatio) * (tlbTime + 2 * memoryTime)
+
+    def __repr__(self):
+        return "TLB(size={size}, policy={policy}, hits={hits}, misses={misses})".format(
+            size=self._size, policy=self._policy, hits=self._hits, misses=self._misses)
+
+
 ## emulates the Memory Management Unit (MMU)
+## traduce con la TLB y, ante un miss, recorriendo la tabla de paginas del proceso que el kernel le asigno
 class MMU():
 
-    def __init__(self, memory):
+    def __init__(self, memory, interruptVector, tlb = None, coreId = 0):
         self._memory = memory
+        self._interruptVector = interruptVector
+        self._coreId = coreId
         self._frameSize = 0
         self._limit = 999
-        self._tlb = dict()
+        self._tlb = tlb if tlb else TLB()
+        ## registro base de la tabla de paginas (PTBR): solo una referencia a la tabla del proceso
+        self._pageTable = None
+        self._asid = None
+        self._references = 0
+        ## objeto con referenced(frameId) al que se le avisa cada acceso (el algoritmo de reemplazo LRU)
+        self._referenceListener = None
 
     @property
     def limit(self):
@@ -174,13 +680,68 @@ class MMU():
     def frameSize(self, frameSize):
         self._frameSize = frameSize
 
-    def resetTLB(self):
-        self._tlb = dict()
+    @property
+    def tlb(self):
+        return self._tlb
 
-    def setPageFrame(self, pageId, frameId):
-        self._tlb[pageId] = frameId
+    @tlb.setter
+    def tlb(self, tlb):
+        self._tlb = tlb
 
+    @property
+    def pageTable(self):
+        return self._pageTable
+
+    @property
+    def asid(self):
+        return self._asid
+
+    @property
+    def referenceListener(self):
+        return self._referenceListener
+
+    @referenceListener.setter
+    def referenceListener(self, referenceListener):
+        self._referenceListener = referenceListener
+
+    ## cambio de contexto: cambia el PTBR a la tabla de paginas del proceso y su asid, en tiempo constante.
+    ## Sin asidTagging la TLB tiene las paginas del proceso anterior, asi que se vacia
+    def switchPageTable(self, pageTable, asid):
+        if not self._tlb.asidTagging and asid != self._asid:
+            self._tlb.flush()
+        self._pageTable = pageTable
+        self._asid = asid
+
+    ## cantidad de accesos a memoria hechos (el "reloj" de los ultimos accesos para LRU)
+    @property
+    def references(self):
+        return self._references
+
+    ## saca la pagina de la TLB (la pagina fue desalojada)
+    def invalidatePage(self, asid, pageId):
+        self._tlb.invalidate(asid, pageId)
+
+    ## retorna None si el page fault no se pudo resolver (el proceso ya no esta en CPU)
     def fetch(self,  logicalAddress):
+        translation = self._translate(logicalAddress)
+        if translation is None:
+            return None
+        entry, physicalAddress = translation
+        entry.referenced = True
+        # obtenemos la instrucción alocada en esa direccion
+        return self._memory.read(physicalAddress)
+
+    def write(self, logicalAddress, value):
+        translation = self._translate(logicalAddress)
+        if translation is None:
+            return False
+        entry, physicalAddress = translation
+        entry.referenced = True
+        entry.dirty = True
+        self._memory.write(physicalAddress, value)
+        return True
+
+    def _translate(self, logicalAddress):
         if (logicalAddress > self._limit):
             raise Exception("Invalid Address,  {logicalAddress} is higher than process limit: {limit}".format(limit = self._limit, logicalAddress = logicalAddress))
         #
@@ -188,66 +749,106 @@ class MMU():
         pageId = logicalAddress // self._frameSize
         offset = logicalAddress % self._frameSize
         #
-        # buscamos la direccion Base del frame donde esta almacenada la pagina
-        try:
-            frameId = self._tlb[pageId]
-        except:
-            raise Exception("\n*\n* ERROR \n*\n Error en el MMU\nNo se cargo la pagina  {pageId}".format(pageId = str(pageId)))
+        # buscamos la entrada de la pagina (con el frame donde esta almacenada): primero en la TLB
+        # y si no esta, en la tabla de paginas
+        entry = self._tlb.lookup(self._asid, pageId)
+        if entry is None:
+            entry = self._pageTable.get(pageId)
+            if entry is None or not entry.valid:
+                entry = self._pageFault(pageId)
+                if entry is None:
+                    return None
+            self._tlb.insert(self._asid, pageId, entry)
+        self._references += 1
+        entry.lastReference = self._references
+        if self._referenceListener:
+            self._referenceListener.referenced(entry.frame)
         #
         ##calculamos la direccion fisica resultante
-        frameBaseDir  = self._frameSize * frameId
-        physicalAddress = frameBaseDir + offset
-        #
-        # obtenemos la instrucción alocada en esa direccion
-        return self._memory.read(physicalAddress)
+        frameBaseDir  = self._frameSize * entry.frame
+        return entry, frameBaseDir + offset
+
+    ## la pagina no esta cargada: el kernel la carga (#PAGE_FAULT) y se reintenta la traduccion.
+    ## Si mientras tanto cambio la tabla de paginas (el kernel saco al proceso del CPU) el acceso se descarta
+    def _pageFault(self, pageId):
+        log.mmu.info("mmu %s - Page fault: page %s", self._coreId, pageId)
+        pageTable = self._pageTable
+        pageFaultIRQ = IRQ(PAGE_FAULT_INTERRUPTION_TYPE, pageId, self._coreId)
+        self._interruptVector.handle(pageFaultIRQ)
+        if pageTable is not self._pageTable:
+            return None
+        entry = self._pageTable.get(pageId)
+        if entry is None or not entry.valid:
+            raise Exception("\n*\n* ERROR \n*\n Error en el MMU\nNo se cargo la pagina  {pageId}".format(pageId = str(pageId)))
+        return entry
 
 
 ## emulates the main Central Processor Unit
 class Cpu():
 
-    def __init__(self, mmu, interruptVector):
+    def __init__(self, mmu, interruptVector, coreId = 0):
         self._mmu = mmu
         self._interruptVector = interruptVector
+        self._coreId = coreId
         self._pc = -1
         self._ir = None
-        self._enable_stats = False
+        self._statsListener = None
 
 
+    ## las estadisticas se toman al comienzo de cada ciclo (luego del timeout de los Timers)
     def tick(self, tickNbr):
-        self._stats()
+        if self._statsListener:
+            self._statsListener.tick(tickNbr)
         if (self.isBusy()):
-            self._fetch()
-            self._decode()
-            self._execute()
+            if self._fetch():
+                self._decode()
+                self._execute()
         else:
-            log.logger.info("cpu - NOOP")
+            log.cpu.info("cpu %s - NOOP", self._coreId)
 
+    ## retorna False si no se pudo obtener la instruccion (page fault que saco al proceso del CPU)
     def _fetch(self):
-        self._ir = self._mmu.fetch(self._pc)
+        instruction = self._mmu.fetch(self._pc)
+        if instruction is None:
+            return False
+        self._ir = instruction
         self._pc += 1
+        return True
 
     def _decode(self):
         ## decode no hace nada en este caso
         pass
 
-    def _stats(self):
-        if self._enable_stats:
-            statsIRQ = IRQ(STAT_INTERRUPTION_TYPE)
-            self._interruptVector.handle(statsIRQ)
+    ## con un proceso en CPU cada tick ejecuta una instruccion
+    def nextEventTick(self, tickNbr):
+        return tickNbr if self.isBusy() else None
+
+    ## solo se saltean ticks con el CPU ocioso: unicamente se registran las estadisticas
+    def skipTicks(self, fromTick, count):
+        if self._statsListener:
+            self._statsListener.skipTicks(fromTick, count)
 
     def _execute(self):
         if ASM.isEXIT(self._ir):
-            killIRQ = IRQ(KILL_INTERRUPTION_TYPE)
+            killIRQ = IRQ(KILL_INTERRUPTION_TYPE, None, self._coreId)
             self._interruptVector.handle(killIRQ)
         elif ASM.isIO(self._ir):
-            ioInIRQ = IRQ(IO_IN_INTERRUPTION_TYPE, self._ir)
+            ioInIRQ = IRQ(IO_IN_INTERRUPTION_TYPE, self._ir, self._coreId)
             self._interruptVector.handle(ioInIRQ)
+        elif ASM.isWRITE(self._ir):
+            ## escribe en la celda de la instruccion (el mismo valor): alcanza para que la pagina quede modificada
+            log.cpu.info("cpu %s - Exec: %s, PC=%s", self._coreId, ASM.decode(self._ir), self._pc)
+            self._mmu.write(self._pc - 1, self._ir)
         else:
-            log.logger.info("cpu - Exec: {instr}, PC={pc}".format(instr=self._ir, pc=self._pc))
+            log.cpu.info("cpu %s - Exec: %s, PC=%s", self._coreId, ASM.decode(self._ir), self._pc)
 
     def isBusy(self):
         return self._pc > -1
 
+    @property
+    def coreId(self):
+        return self._coreId
+
     @property
     def pc(self):
         return self._pc
@@ -256,24 +857,32 @@ class Cpu():
     def pc(self, addr):
         self._pc = addr
 
+    ## objeto con tick(tickNbr) y skipTicks(fromTick, count) que se llama en cada ciclo
     @property
-    def enable_stats(self):
-        return self._enable_stats
+    def statsListener(self):
+        return self._statsListener
 
-    @enable_stats.setter
-    def enable_stats(self, enable_stats):
-        self._enable_stats = enable_stats
+    @statsListener.setter
+    def statsListener(self, statsListener):
+        self._statsListener = statsListener
 
     def __repr__(self):
-        return "CPU(PC={pc})".format(pc=self._pc)
+        return "CPU{coreId}(PC={pc})".format(coreId=self._coreId, pc=self._pc)
 
 ## emulates an Input/output device of the Hardware
 class AbstractIODevice():
 
-    def __init__(self, deviceId, deviceTime):
+    def __init__(self, deviceId, deviceTime, cylinders = None):
         self._deviceId = deviceId
         self._deviceTime = deviceTime
+        self._operationTime = deviceTime
+        ## solo los dispositivos con cylinders (el disco) tienen una posicion a la que moverse
+        self._cylinders = cylinders
+        self._headPosition = 0
+        self._seekDistance = 0
         self._busy = False
+        ## lo conecta el Hardware al registrarlo (addIoDevice)
+        self._interruptVector = None
 
     @property
     def deviceId(self):
@@ -287,32 +896,92 @@ class AbstractIODevice():
     def is_idle(self):
         return not self._busy
 
-    ## executes an I/O instruction
-    def execute(self, operation):
+    @property
+    def interruptVector(self):
+        return self._interruptVector
+
+    @interruptVector.setter
+    def interruptVector(self, interruptVector):
+        self._interruptVector = interruptVector
+
+    @property
+    def cylinders(self):
+        return self._cylinders
+
+    @property
+    def headPosition(self):
+        return self._headPosition
+
+    ## posiciones recorridas por el cabezal en total
+    @property
+    def seekDistance(self):
+        return self._seekDistance
+
+    ## executes an I/O instruction (en la posicion indicada, si el dispositivo tiene posiciones)
+    def execute(self, operation, position = None):
         if (self._busy):
             raise Exception("Device {id} is busy, can't  execute operation: {op}".format(id = self.deviceId, op = operation))
         else:
             self._busy = True
             self._ticksCount = 0
             self._operation = operation
+            self._operationTime = self._deviceTime + self._seekTime(position)
+            if position is not None:
+                self._headPosition = position
+
+    ## ticks extra para llegar a la posicion de la operacion
+    def _seekTime(self, position):
+        return 0
 
     def tick(self, tickNbr):
         if (self._busy):
             self._ticksCount += 1
-            if (self._ticksCount > self._deviceTime):
+            if (self._ticksCount > self._operationTime):
                 ## operation execution has finished
                 self._busy = False
                 ioOutIRQ = IRQ(IO_OUT_INTERRUPTION_TYPE, self._deviceId)
-                HARDWARE.interruptVector.handle(ioOutIRQ)
+                self._interruptVector.handle(ioOutIRQ)
             else:
-                log.logger.info("device {deviceId} - Busy: {ticksCount} of {deviceTime}".format(deviceId = self.deviceId, ticksCount = self._ticksCount, deviceTime = self._deviceTime))
+                log.io.info("device %s - Busy: %s of %s", self._deviceId, self._ticksCount, self._operationTime)
 
+    ## el tick en el que termina la operacion en curso
+    def nextEventTick(self, tickNbr):
+        if (self._busy):
+            return tickNbr + self._operationTime - self._ticksCount
+        return None
+
+    def skipTicks(self, fromTick, count):
+        if (self._busy):
+            self._ticksCount += count
 
+
+## cada dispositivo se identifica por su deviceId: para tener varios del mismo tipo, darles ids distintos
 class PrinterIODevice(AbstractIODevice):
-    def __init__(self):
-        super(PrinterIODevice, self).__init__("Printer", 3)
+    def __init__(self, deviceId = PRINTER_DEVICE_ID):
+        super(PrinterIODevice, self).__init__(deviceId, 3)
 
 
+## disco con un cabezal que se mueve entre DISK_CYLINDERS cilindros: ademas de su latencia,
+## cada operacion tarda un tick cada DISK_CYLINDERS_PER_TICK cilindros recorridos
+class DiskIODevice(AbstractIODevice):
+    def __init__(self, deviceId = DISK_DEVICE_ID):
+        super(DiskIODevice, self).__init__(deviceId, 5, DISK_CYLINDERS)
+
+    def _seekTime(self, position):
+        if position is None:
+            return 0
+        distance = abs(position - self._headPosition)
+        self._seekDistance += distance
+        return distance // DISK_CYLINDERS_PER_TICK
+
+
+## placa de red simulada: solo tiene una latencia mayor
+class NetworkIODevice(AbstractIODevice):
+    def __init__(self, deviceId = NETWORK_DEVICE_ID):
+        super(NetworkIODevice, self).__init__(deviceId, 8)
+
+
+## el Timer solo controla el quantum: el Clock hace el tick del CPU despues del de todos los Timers
 class Timer:
 
     def __init__(self, cpu, interruptVector):
@@ -325,12 +994,18 @@ class Timer:
     def tick(self, tickNbr):
         if self._active and (self._tickCount >= self._quantum) and self._cpu.isBusy():
             # se “cumplio” el limite de ejecuciones
-            timeoutIRQ = IRQ(TIMEOUT_INTERRUPTION_TYPE)
+            timeoutIRQ = IRQ(TIMEOUT_INTERRUPTION_TYPE, None, self._cpu.coreId)
             self._interruptVector.handle(timeoutIRQ)
 
         # registro que el proceso en CPU corrio un ciclo mas
         self._tickCount += 1
-        self._cpu.tick(tickNbr)
+
+    def nextEventTick(self, tickNbr):
+        ## el timeout solo puede ocurrir con el CPU ocupado, asi que decide el CPU
+        return self._cpu.nextEventTick(tickNbr)
+
+    def skipTicks(self, fromTick, count):
+        self._tickCount += count
 
     def reset(self):
            self._tickCount = 0
@@ -339,27 +1014,77 @@ class Timer:
     def quantum(self):
         return self._quantum
 
+    ## un quantum de 0 (o None) desactiva el Timer
     @quantum.setter
     def quantum(self, quantum):
-        self._active = True
-        self._quantum = quantum
+        self._active = bool(quantum)
+        self._quantum = quantum or 0
+
+
+## un core del procesador: su CPU, su MMU (con su TLB) y su Timer
+class Core():
+
+    def __init__(self, coreId, memory, interruptVector):
+        self._coreId = coreId
+        self._mmu = MMU(memory, interruptVector, coreId = coreId)
+        self._cpu = Cpu(self._mmu, interruptVector, coreId)
+        self._timer = Timer(self._cpu, interruptVector)
+
+    @property
+    def coreId(self):
+        return self._coreId
+
+    @property
+    def cpu(self):
+        return self._cpu
+
+    @property
+    def mmu(self):
+        return self._mmu
+
+    @property
+    def timer(self):
+        return self._timer
+
+    def __repr__(self):
+        return "Core {coreId}: {cpu}".format(coreId=self._coreId, cpu=self._cpu)
 
 
 ## emulates the Hardware that were the Operative System run
+## cada instancia es una maquina independiente: el Kernel recibe el Hardware sobre el que corre
 class Hardware():
 
-    ## Setup our hardware
-    def setup(self, memorySize):
+    ## Setup our hardware (con `cores` cores que comparten la memoria, el clock y los dispositivos)
+    def setup(self, memorySize, ticksPerSecond = REAL_TIME_CLOCK_RATE, eventDriven = False, cores = 1):
         ## add the components to the "motherboard"
         self._memory = Memory(memorySize)
         self._interruptVector = InterruptVector()
-        self._clock = Clock()
-        self._ioDevice = PrinterIODevice()
-        self._mmu = MMU(self._memory)
-        self._cpu = Cpu(self._mmu, self._interruptVector)
-        self._timer = Timer(self._cpu, self._interruptVector)
-        self._clock.addSubscriber(self._ioDevice)
-        self._clock.addSubscriber(self._timer)
+        if eventDriven:
+            self._clock = EventDrivenClock(ticksPerSecond)
+        else:
+            self._clock = Clock(ticksPerSecond)
+        ## primero el InterruptVector, asi las IRQs pendientes se entregan al comienzo del tick
+        self._clock.addSubscriber(self._interruptVector)
+        self._cores = [Core(coreId, self._memory, self._interruptVector) for coreId in range(cores)]
+        ## registro de dispositivos de IO: deviceId -> device
+        self._ioDevices = dict()
+        self.addIoDevice(PrinterIODevice())
+        self.addIoDevice(DiskIODevice())
+        self.addIoDevice(NetworkIODevice())
+        ## en cada tick: primero los timeouts de todos los cores y despues cada CPU ejecuta
+        for core in self._cores:
+            self._clock.addSubscriber(core.timer)
+        for core in self._cores:
+            self._clock.addSubscriber(core.cpu)
+
+    ## conecta un dispositivo (tambien despues de crear el Kernel) y le asigna su instruccion de IO
+    def addIoDevice(self, device):
+        if device.deviceId in self._ioDevices:
+            raise Exception("There's already an IO device with id {id}".format(id = device.deviceId))
+        registerIoDevice(device.deviceId)
+        device.interruptVector = self._interruptVector
+        self._ioDevices[device.deviceId] = device
+        self._clock.addSubscriber(device)
 
     def switchOn(self):
         log.logger.info(" ---- SWITCH ON ---- ")
@@ -369,9 +1094,14 @@ class Hardware():
         self.clock.stop()
         log.logger.info(" ---- SWITCH OFF ---- ")
 
+    @property
+    def cores(self):
+        return self._cores
+
+    ## cpu, mmu y timer son los del core 0 (el unico con un solo core)
     @property
     def cpu(self):
-        return self._cpu
+        return self._cores[0].cpu
 
     @property
     def clock(self):
@@ -387,20 +1117,20 @@ class Hardware():
 
     @property
     def mmu(self):
-        return self._mmu
+        return self._cores[0].mmu
 
     @property
-    def ioDevice(self):
-        return self._ioDevice
+    def ioDevices(self):
+        return self._ioDevices
 
     @property
     def timer(self):
-        return self._timer
+        return self._cores[0].timer
 
     def __repr__(self):
-        return "HARDWARE state {cpu}\n{mem}".format(cpu=self._cpu, mem=self._memory)
+        return "HARDWARE state {cores}\n{mem}".format(cores=self._cores, mem=self._memory)
 
-### HARDWARE is a global variable
-### can be access from any
+### HARDWARE is a global variable: la maquina por defecto de main.py
+### (el Kernel y los dispositivos solo usan el Hardware que se les pasa)
 HARDWARE = Hardware()
 
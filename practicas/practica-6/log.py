@@ -2,10 +2,27 @@ import logging
 
 logger = logging.getLogger()
 
-def setupLogger():
+## loggers por subsistema: cada uno puede tener su propio nivel, por ejemplo
+##     log.setLevel('cpu', logging.WARNING)
+## por defecto heredan el nivel del logger principal.
+## En el camino de cada tick usar argumentos lazy (estilo %) para que, con el nivel
+## deshabilitado, no se formatee ningun string:
+##     log.cpu.info("cpu - Exec: %s, PC=%s", instr, pc)
+clock = logging.getLogger('clock')
+cpu = logging.getLogger('cpu')
+mmu = logging.getLogger('mmu')
+irq = logging.getLogger('irq')
+io = logging.getLogger('io')
+sched = logging.getLogger('sched')
+loader = logging.getLogger('loader')
+
+def setupLogger(level = logging.DEBUG):
     ## Configure Logger
     handler = logging.StreamHandler()
     formatter = logging.Formatter('%(message)s')
     handler.setFormatter(formatter)
     logger.addHandler(handler)
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(level)
+
+def setLevel(subsystem, level):
+    logging.getLogger(subsystem).setLevel(level)
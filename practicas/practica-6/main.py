@@ -12,10 +12,20 @@ if __name__ == '__main__':
 
     ## setup our hardware and set memory size to 2 "cells"
     HARDWARE.setup(20)
+    ## para correr sin esperas entre ticks ("fast-forward") hasta que terminen todos los procesos:
+    # HARDWARE.setup(20, FAST_FORWARD_CLOCK_RATE)
+    ## o a una velocidad escalada, por ejemplo 1000 ticks por segundo:
+    # HARDWARE.setup(20, 1000)
+    ## con 4 cores (cada uno con su CPU, MMU y Timer) que comparten la memoria y los dispositivos:
+    # HARDWARE.setup(20, REAL_TIME_CLOCK_RATE, False, 4)
+    ## TLB de 4 entradas, reemplazo FIFO y entradas etiquetadas con el pid (no se vacia en cada cambio de contexto):
+    # HARDWARE.mmu.tlb = TLB(4, TLB_FIFO_POLICY, asidTagging=True)
 
     ## new create the Operative System Kernel
     # "booteamos" el sistema operativo
     kernel = Kernel()
+    ## para comparar la tasa de page faults de cada algoritmo de reemplazo en el resumen final:
+    # kernel.statistics.recordPageReferences = True
 
     prg1 = Program([ASM.CPU(2), ASM.IO(), ASM.CPU(3), ASM.IO(), ASM.CPU(2)])
     prg2 = Program([ASM.CPU(7)])
@@ -29,6 +39,18 @@ if __name__ == '__main__':
     kernel.run("C:/prg2.exe", 2)
     kernel.run("C:/prg3.exe", 1)
 
+    ## un programa que hace IO en el disco en lugar de en la impresora:
+    # diskPrg = Program([ASM.CPU(3), ASM.IO(DISK_DEVICE_ID), ASM.CPU(2)])
+    # kernel.fileSystem.write("C:/diskPrg.exe", diskPrg)
+    # kernel.run("C:/diskPrg.exe", 1)
+
+    ## o, en lugar de los programas de arriba, un workload desde un archivo (ver WorkloadLoader en so.py):
+    # WorkloadLoader(kernel).load("workload.jsonl")
+
+    ## el Kernel detiene el clock cuando terminan todos los procesos (kernel.hasFinished);
+    ## para otra condicion de corte, por ejemplo a los 100 ticks:
+    # HARDWARE.clock.stopCondition = lambda: HARDWARE.clock.currentTick >= 100
+
     ## Switch on computer
     HARDWARE.switchOn()
 
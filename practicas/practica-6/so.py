@@ -2,10 +2,78 @@
 
 from hardware import *
 import log
+import logging
 from enum import Enum
-from collections import deque
+from collections import deque, namedtuple, OrderedDict
+from bisect import bisect_left, bisect_right, insort
+from random import Random
+from heapq import heapify, heappush, heappop, merge
+from itertools import chain, count, repeat
+import json
+import tempfile
 
 TICKSTOAGE = 4
+QUANTUM = 4
+FRAME_SIZE = 4
+LOAD_BALANCE_PERIOD = 10
+## mascara de afinidad que permite correr en cualquier core (todos los bits en 1)
+ALL_CORES = -1
+GANTT_CHUNK_SIZE = 1024
+
+## run-length encoded sequence of instructions
+## guarda runs (opcode, count) y la suma acumulada de los counts (_ends), asi el acceso
+## aleatorio a una instruccion es una busqueda binaria y la memoria usada es proporcional
+## a la cantidad de runs, no a la cantidad de instrucciones
+class RunLengthInstructions():
+
+    def __init__(self):
+        self._opcodes = []
+        self._ends = []
+
+    def append(self, opcode, count = 1):
+        if count <= 0:
+            return
+        if self._opcodes and self._opcodes[-1] == opcode:
+            self._ends[-1] += count
+        else:
+            self._opcodes.append(opcode)
+            self._ends.append(len(self) + count)
+
+    def runs(self):
+        start = 0
+        for opcode, end in zip(self._opcodes, self._ends):
+            yield opcode, end - start
+            start = end
+
+    ## las instrucciones de [start, stop) expandidas, listas para escribir en memoria
+    def slice(self, start, stop):
+        stop = min(stop, len(self))
+        block = bytearray()
+        run = bisect_right(self._ends, start)
+        while start < stop:
+            end = min(self._ends[run], stop)
+            block += bytes((self._opcodes[run],)) * (end - start)
+            start = end
+            run += 1
+        return block
+
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not (0 <= index < len(self)):
+            raise IndexError("instruction index out of range: {index}".format(index=index))
+        return self._opcodes[bisect_right(self._ends, index)]
+
+    def __iter__(self):
+        for opcode, count in self.runs():
+            yield from repeat(opcode, count)
+
+    def __repr__(self):
+        return "{runs}".format(runs=[InstructionRun(opcode, count) for opcode, count in self.runs()])
+
 
 ## emulates a compiled program
 class Program():
@@ -21,13 +89,18 @@ class Program():
         self._instructions.append(instruction)
 
     def expand(self, instructions):
-        expanded = []
+        ## no se expanden los runs (ASM.CPU(n)): se guardan como (opcode, n)
+        expanded = RunLengthInstructions()
         for i in instructions:
-            if isinstance(i, list):
+            if isinstance(i, InstructionRun):
+                ## is a run of the same instruction
+                expanded.append(i.opcode, i.count)
+            elif isinstance(i, list):
                 ## is a list of instructions
-                expanded.extend(i)
+                for instruction in i:
+                    expanded.append(instruction)
             else:
-                ## a single instr (a String)
+                ## a single instr (an opcode)
                 expanded.append(i)
 
         ## now test if last instruction is EXIT
@@ -42,18 +115,30 @@ class Program():
         return "Program({instructions})".format(instructions=self._instructions)
 
 
+## pedido de IO encolado en un IoDeviceController: el pcb, la instruccion, la posicion (cilindro)
+## que necesita en el dispositivo y el tick en el que se encolo
+IoRequest = namedtuple('IoRequest', ['pcb', 'instruction', 'position', 'arrival'])
+
 ## emulates an Input/Output device controller (driver)
+## la cola de pedidos la ordena un IoScheduler; para los dispositivos con posiciones (el disco)
+## cada pedido va a un cilindro pseudo-aleatorio (reproducible) y el scheduler puede minimizar el seek
 class IoDeviceController():
 
-    def __init__(self, device):
+    def __init__(self, device, clock, ioScheduler = None):
         self._device = device
-        self._waiting_queue = []
+        self._clock = clock
+        self._waiting_queue = ioScheduler if ioScheduler is not None else FcfsIoScheduler()
         self._currentPCB = None
+        self._positions = Random(0)
+        self._requests = 0
+        self._totalWait = 0
+        self._maxWait = 0
 
     def runOperation(self, pcb, instruction):
-        pair = {'pcb': pcb, 'instruction': instruction}
-        # append: adds the element at the end of the queue
-        self._waiting_queue.append(pair)
+        position = None
+        if self._device.cylinders:
+            position = self._positions.randrange(self._device.cylinders)
+        self._waiting_queue.add(IoRequest(pcb, instruction, position, self._clock.currentTick))
         # try to send the instruction to hardware's device (if is idle)
         self.__load_from_waiting_queue_if_apply()
 
@@ -65,18 +150,132 @@ class IoDeviceController():
 
     def __load_from_waiting_queue_if_apply(self):
         if (len(self._waiting_queue) > 0) and self._device.is_idle:
-            ## pop(): extracts (deletes and return) the first element in queue
-            pair = self._waiting_queue.pop(0)
-            #print(pair)
-            pcb = pair['pcb']
-            instruction = pair['instruction']
-            self._currentPCB = pcb
-            self._device.execute(instruction)
+            request = self._waiting_queue.next(self._device.headPosition)
+            wait = self._clock.currentTick - request.arrival
+            self._requests += 1
+            self._totalWait += wait
+            self._maxWait = max(self._maxWait, wait)
+            self._currentPCB = request.pcb
+            self._device.execute(request.instruction, request.position)
+
+    @property
+    def device(self):
+        return self._device
+
+    ## pedidos atendidos y cuanto esperaron en la cola (en ticks)
+    @property
+    def requests(self):
+        return self._requests
+
+    @property
+    def averageWait(self):
+        return self._totalWait / self._requests if self._requests else 0
 
+    @property
+    def maxWait(self):
+        return self._maxWait
 
     def __repr__(self):
         return "IoDeviceController for {deviceID} running: {currentPCB} waiting: {waiting_queue}".format(deviceID=self._device.deviceId, currentPCB=self._currentPCB, waiting_queue=self._waiting_queue)
 
+## ordena los pedidos de IO de un dispositivo: add(request) y next(headPosition) el proximo a atender
+class IoScheduler():
+
+    def add(self, request):
+        pass
+
+    def next(self, headPosition):
+        pass
+
+    def __len__(self):
+        pass
+
+## en orden de llegada
+class FcfsIoScheduler(IoScheduler):
+
+    def __init__(self):
+        self._queue = deque()
+
+    def add(self, request):
+        self._queue.append(request)
+
+    def next(self, headPosition):
+        return self._queue.popleft()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __repr__(self):
+        return repr(list(self._queue))
+
+## base de los schedulers por posicion: los pedidos ordenados por (posicion, llegada)
+## en una lista, asi encontrar el mas cercano al cabezal es una busqueda binaria
+class PositionIoScheduler(IoScheduler):
+
+    def __init__(self):
+        self._queue = []
+        self._arrivals = count()
+
+    def add(self, request):
+        insort(self._queue, (request.position, next(self._arrivals), request))
+
+    def __len__(self):
+        return len(self._queue)
+
+    ## indice del primer pedido en o despues de la posicion
+    def _indexFrom(self, headPosition):
+        return bisect_left(self._queue, (headPosition,))
+
+    ## indice del pedido mas viejo en la misma posicion que el del indice: entre los pedidos
+    ## de una misma posicion se respeta el orden de llegada
+    def _oldestAt(self, index):
+        return bisect_left(self._queue, (self._queue[index][0],))
+
+    def _pop(self, index):
+        return self._queue.pop(index)[2]
+
+    def __repr__(self):
+        return repr([request for _, _, request in self._queue])
+
+## Shortest Seek Time First: el pedido mas cercano al cabezal
+class SstfIoScheduler(PositionIoScheduler):
+
+    def next(self, headPosition):
+        index = self._indexFrom(headPosition)
+        if index == len(self._queue):
+            return self._pop(self._oldestAt(index - 1))
+        if index > 0 and headPosition - self._queue[index - 1][0] < self._queue[index][0] - headPosition:
+            return self._pop(self._oldestAt(index - 1))
+        return self._pop(index)
+
+## elevador: el cabezal atiende en un sentido hasta que no quedan pedidos por delante y despues invierte
+class ScanIoScheduler(PositionIoScheduler):
+
+    def __init__(self):
+        super().__init__()
+        self._ascending = True
+
+    def next(self, headPosition):
+        index = self._indexFrom(headPosition)
+        if self._ascending and index == len(self._queue):
+            self._ascending = False
+        elif not self._ascending and (index == 0 and self._queue[0][0] > headPosition):
+            self._ascending = True
+        if self._ascending:
+            return self._pop(index)
+        ## bajando: el pedido mas cercano en o antes de la posicion
+        index = bisect_right(self._queue, (headPosition, float('inf'))) - 1
+        return self._pop(self._oldestAt(index))
+
+## C-LOOK: atiende solo subiendo; cuando no quedan pedidos por delante vuelve al de menor posicion
+class CLookIoScheduler(PositionIoScheduler):
+
+    def next(self, headPosition):
+        index = self._indexFrom(headPosition)
+        if index == len(self._queue):
+            index = 0
+        return self._pop(index)
+
 ## emulates the  Interruptions Handlers
 class AbstractInterruptionHandler():
     def __init__(self, kernel):
@@ -89,33 +288,56 @@ class AbstractInterruptionHandler():
     def execute(self, irq):
         log.logger.error("-- EXECUTE MUST BE OVERRIDEN in class {classname}".format(classname=self.__class__.__name__))
 
-    def _runPcb(self, pcb):
-        log.logger.info(HARDWARE)
-        log.logger.info("\n Executing program: {name}".format(name=pcb.path))
+    def _runPcb(self, pcb, coreId):
+        ## el repr del Hardware incluye un dump de toda la memoria: solo se arma si se va a loguear
+        if log.sched.isEnabledFor(logging.DEBUG):
+            log.sched.debug("%s", self.kernel.hardware)
+        log.sched.info("\n Executing program: %s on core %s", pcb.path, coreId)
+        if pcb.coreId is not None and pcb.coreId != coreId:
+            self.kernel.statistics.countMigration()
+        pcb.coreId = coreId
         pcb.state = State.RUNNING
-        self.kernel.runningPCB = pcb
-        self.kernel.dispatcher.load(pcb)
+        self.kernel.runningPCBs[coreId] = pcb
+        self.kernel.dispatcher.load(pcb, coreId)
 
-    def runNextProgramCPUout(self):
-        self.kernel.dispatcher.save()
-        self.kernel.runningPCB = None
-        if not self.kernel.scheduler.isReadyQueueEmpty():
-            pcb = self.kernel.scheduler.getNext()
-            self._runPcb(pcb)
+    def runNextProgramCPUout(self, coreId):
+        self.kernel.dispatcher.save(None, coreId)
+        self.kernel.runningPCBs[coreId] = None
+        if not self.kernel.scheduler.isReadyQueueEmpty(coreId):
+            pcb = self.kernel.scheduler.getNext(coreId)
+            self._runPcb(pcb, coreId)
 
+    ## el pcb va a un core libre (de los de su afinidad); si no hay, puede expropiar a alguno de los que estan corriendo
     def runNextProgramCPUin(self, pcb):
-        if not self.kernel.runningPCB:
-            self._runPcb(pcb)
+        coreId = self.kernel.idleCore(pcb)
+        if coreId is not None:
+            self._runPcb(pcb, coreId)
+            return
+        coreId = self._expropiationCandidate(pcb)
+        if coreId is not None:
+            expropiatedPcb = self.kernel.runningPCBs[coreId]
+            self.kernel.dispatcher.save(expropiatedPcb, coreId)
+            expropiatedPcb.state = State.READY
+            self.kernel.scheduler.add(expropiatedPcb, coreId)
+            self._runPcb(pcb, coreId)
         else:
-            if(self.kernel.scheduler.mustExpropiate(self.kernel.runningPCB, pcb)):
-                expropiatedPcb = self.kernel.runningPCB
-                self.kernel.dispatcher.save(expropiatedPcb)
-                expropiatedPcb.state = State.READY
-                self.kernel.scheduler.add(expropiatedPcb)
-                self._runPcb(pcb)
-            else:
-                pcb.state = State.READY
-                self.kernel.scheduler.add(pcb)
+            pcb.state = State.READY
+            self.kernel.scheduler.add(pcb)
+
+    ## de los cores cuyo proceso el scheduler expropiaria por el pcb, el del proceso de peor prioridad
+    def _expropiationCandidate(self, pcb):
+        candidate = None
+        for coreId, runningPCB in enumerate(self.kernel.runningPCBs):
+            if pcb.canRunOn(coreId) and self.kernel.scheduler.mustExpropiate(runningPCB, pcb):
+                if candidate is None or runningPCB.priority > self.kernel.runningPCBs[candidate].priority:
+                    candidate = coreId
+        return candidate
+
+    def killRunningPCB(self, coreId):
+        pcbToKill = self.kernel.runningPCBs[coreId]
+        pcbToKill.state = State.TERMINATED
+        self.kernel.memoryManager.freePages(pcbToKill.pageTable)
+        self.runNextProgramCPUout(coreId)
 
 class NewInterruptionHandler(AbstractInterruptionHandler):
 
@@ -123,57 +345,75 @@ class NewInterruptionHandler(AbstractInterruptionHandler):
         parameters = irq.parameters
         path = parameters['path']
         priority = parameters['priority']
+        affinity = parameters.get('affinity', ALL_CORES)
         pageTable = self.kernel.loader.load(path)
         if (pageTable == -1):
             return
-        pcb = PCB(self.kernel.pcbTable.getNewPID(), path, priority, pageTable)
+        pcb = PCB(self.kernel.pcbTable.getNewPID(), path, priority, pageTable, affinity)
         self.kernel.pcbTable.add(pcb)
         self.runNextProgramCPUin(pcb)
 
 class KillInterruptionHandler(AbstractInterruptionHandler):
 
     def execute(self, irq):
-        log.logger.info(" Program Finished ")
-        pcbToKill = self.kernel.runningPCB
-        pcbToKill.state = State.TERMINATED
-        self.kernel.memoryManager.freeFrames(pcbToKill.pageTable)
-        self.runNextProgramCPUout()
+        log.irq.info(" Program Finished ")
+        self.killRunningPCB(irq.coreId)
+
+class PageFaultInterruptionHandler(AbstractInterruptionHandler):
+
+    def execute(self, irq):
+        pageId = irq.parameters
+        pcb = self.kernel.runningPCBs[irq.coreId]
+        if not self.kernel.loader.loadPage(pcb, pageId):
+            ## no hay frames libres: el proceso no puede continuar
+            log.irq.info(" Program %s killed: no free frames to load page %s", pcb.path, pageId)
+            self.killRunningPCB(irq.coreId)
 
 class IoInInterruptionHandler(AbstractInterruptionHandler):
 
     def execute(self, irq):
         operation = irq.parameters
-        pcb = self.kernel.runningPCB
-        self.kernel.dispatcher.save(pcb)
+        pcb = self.kernel.runningPCBs[irq.coreId]
+        deviceId = ASM.ioDevice(operation)
+        if deviceId not in self.kernel.hardware.ioDevices:
+            ## el opcode lo registro otra maquina: en esta no hay ese dispositivo
+            log.logger.error(" Program %s killed: there's no IO device %s in this Hardware", pcb.path, deviceId)
+            self.killRunningPCB(irq.coreId)
+            return
+        self.kernel.dispatcher.save(pcb, irq.coreId)
         pcb.state = State.WAITING
-        self.kernel.ioDeviceController.runOperation(pcb, operation)
-        log.logger.info(self.kernel.ioDeviceController)
-        self.runNextProgramCPUout()
+        ioDeviceController = self.kernel.ioDeviceController(deviceId)
+        ioDeviceController.runOperation(pcb, operation)
+        log.io.info("%s", ioDeviceController)
+        self.runNextProgramCPUout(irq.coreId)
 
 class IoOutInterruptionHandler(AbstractInterruptionHandler):
 
     def execute(self, irq):
-        pcb = self.kernel.ioDeviceController.getFinishedPCB()
-        log.logger.info(self.kernel.ioDeviceController)
+        ## el parametro del #IO_OUT es el deviceId del dispositivo que termino
+        ioDeviceController = self.kernel.ioDeviceController(irq.parameters)
+        pcb = ioDeviceController.getFinishedPCB()
+        log.io.info("%s", ioDeviceController)
         self.runNextProgramCPUin(pcb)
 
 class TimeOutInterruptionHandler(AbstractInterruptionHandler):
 
     def execute(self, irq):
-        if not self.kernel.scheduler.isReadyQueueEmpty():
-            expropiatedPcb = self.kernel.runningPCB
-            self.kernel.dispatcher.save(expropiatedPcb)
+        if not self.kernel.scheduler.isReadyQueueEmpty(irq.coreId):
+            expropiatedPcb = self.kernel.runningPCBs[irq.coreId]
+            self.kernel.dispatcher.save(expropiatedPcb, irq.coreId)
             expropiatedPcb.state = State.READY
-            pcb = self.kernel.scheduler.getNext()
-            self.kernel.scheduler.add(expropiatedPcb)
-            self._runPcb(pcb)
+            pcb = self.kernel.scheduler.getNext(irq.coreId)
+            self.kernel.scheduler.add(expropiatedPcb, irq.coreId)
+            self._runPcb(pcb, irq.coreId)
 
-class StatInterruptionHandler(AbstractInterruptionHandler):
+## un core libre busca un proceso para correr (por ejemplo despues de un balanceo de carga)
+class RescheduleInterruptionHandler(AbstractInterruptionHandler):
 
     def execute(self, irq):
-        self.kernel.scheduler.checkTick(self.kernel)
-        self.kernel.ganttDiagram.checkTick()
-    
+        if self.kernel.runningPCBs[irq.coreId] is None:
+            self.runNextProgramCPUout(irq.coreId)
+
 class State(Enum):
     NEW = 1
     READY = 2
@@ -183,13 +423,17 @@ class State(Enum):
 
 class PCB():
 
-    def __init__(self, pid, path, priority, pageTable):
+    def __init__(self, pid, path, priority, pageTable, affinity = ALL_CORES):
         self._pid = pid
         self._pc = 0
         self._state = State.NEW
         self._path = path
         self._priority = priority
         self._pageTable = pageTable
+        self._stateListener = None
+        ## mascara de bits de los cores en los que puede correr y el ultimo core en el que corrio
+        self._affinity = affinity
+        self._coreId = None
 
     @property
     def pid(self):
@@ -201,7 +445,19 @@ class PCB():
     
     @state.setter
     def state(self, newState):
+        oldState = self._state
         self._state = newState
+        if self._stateListener:
+            self._stateListener.stateChanged(self, oldState, newState)
+
+    ## a quien avisar de cada cambio de estado (la PCBTable que lo contiene)
+    @property
+    def stateListener(self):
+        return self._stateListener
+
+    @stateListener.setter
+    def stateListener(self, listener):
+        self._stateListener = listener
 
     @property
     def pc(self):
@@ -227,12 +483,34 @@ class PCB():
     def pageTable(self, newTable):
         self._pageTable = newTable
 
+    @property
+    def affinity(self):
+        return self._affinity
+
+    @affinity.setter
+    def affinity(self, affinity):
+        self._affinity = affinity
+
+    def canRunOn(self, coreId):
+        return (self._affinity >> coreId) & 1 == 1
+
+    @property
+    def coreId(self):
+        return self._coreId
+
+    @coreId.setter
+    def coreId(self, coreId):
+        self._coreId = coreId
+
 class PCBTable():
 
     def __init__(self, kernel):
         self._table = {}
         self._incrVal = -1
         self._kernel = kernel
+        ## cantidad de procesos en cada estado, actualizada con cada cambio de estado
+        self._stateCounts = {state: 0 for state in State}
+        self._stateListeners = []
 
     def get(self, pid):
         return self._table.get(pid)
@@ -240,146 +518,273 @@ class PCBTable():
     def getAll(self):
         return {pid: pcb.state for pid, pcb in self._table.items()}
 
+    def getPCBs(self):
+        return self._table.values()
+
     def add(self, pcb):
         self._table[pcb.pid] = pcb
+        self._stateCounts[pcb.state] += 1
+        pcb.stateListener = self
+        for listener in self._stateListeners:
+            listener.stateChanged(pcb, None, pcb.state)
 
     def remove(self, pid):
-        del self._table[pid]
+        pcb = self._table.pop(pid)
+        self._stateCounts[pcb.state] -= 1
+        pcb.stateListener = None
 
-    def getNewPID(self):
-        self._incrVal += 1
-        return self._incrVal
-    
-    def compact(self):
-        interruptedPCB = self.kernel.runningPCB
-        self.kernel.dispatcher.save(self.kernel.runningPCB)
-        interruptedPCB.state = State.READY
+    ## listener.stateChanged(pcb, oldState, newState) se llama al agregar un proceso
+    ## (con oldState None) y en cada cambio de estado
+    def addStateListener(self, listener):
+        self._stateListeners.append(listener)
+
+    def stateChanged(self, pcb, oldState, newState):
+        self._stateCounts[oldState] -= 1
+        self._stateCounts[newState] += 1
+        for listener in self._stateListeners:
+            listener.stateChanged(pcb, oldState, newState)
 
-        pcbList = list(self._table.values())
-        sortedTable = sorted(pcbList, key=lambda pcb: pcb.baseDir)
-        offset = 0
+    def countInState(self, state):
+        return self._stateCounts[state]
 
-        for pcb in sortedTable:
-            displacement = pcb.baseDir - offset
-            pcb.baseDir -= displacement
-            pcb.pc -= displacement
-            pcb.limitDir -= displacement
-            offset = pcb.limitDir + 1
+    def __len__(self):
+        return len(self._table)
 
-        self.kernel.dispatcher.load(interruptedPCB)
-        interruptedPCB.state = State.RUNNING
+    def getNewPID(self):
+        self._incrVal += 1
+        return self._incrVal
 
+    def allTerminated(self):
+        return self._stateCounts[State.TERMINATED] == len(self._table)
+    
     @property
     def kernel(self):
         return self._kernel
     
+## carga y guarda el contexto de un proceso en el core indicado
 class Dispatcher():
 
-    def load(self, pcb):
-        HARDWARE.mmu.resetTLB()
+    def __init__(self, hardware):
+        self._hardware = hardware
 
-        for page, frame in enumerate(pcb.pageTable):
-            HARDWARE.mmu.setPageFrame(page, frame)
-        
-        HARDWARE.cpu.pc = pcb.pc
-        HARDWARE.timer.reset()
+    def load(self, pcb, coreId = 0):
+        core = self._hardware.cores[coreId]
+        core.mmu.switchPageTable(pcb.pageTable, pcb.pid)
+        core.mmu.limit = len(pcb.pageTable) * core.mmu.frameSize - 1
+        core.cpu.pc = pcb.pc
+        core.timer.reset()
 
-    def save(self, pcb = None):
+    def save(self, pcb = None, coreId = 0):
+        core = self._hardware.cores[coreId]
         if pcb:
-            pcb.pc = HARDWARE.cpu.pc
-        HARDWARE.cpu.pc = -1
+            pcb.pc = core.cpu.pc
+        core.cpu.pc = -1
+        core.mmu.switchPageTable(None, None)
 
+## paginacion bajo demanda: al crear el proceso no se carga ninguna pagina,
+## cada pagina se carga recien cuando el MMU la necesita (#PAGE_FAULT)
 class Loader():
-    def __init__(self, memoryManager, fileSystem, frameSize):
+    def __init__(self, memoryManager, fileSystem, frameSize, memory):
         self._memoryManager = memoryManager
         self._fileSystem = fileSystem
         self._frameSize = frameSize
-    
-    def __createPageTable(self, availableFrames, program, progSize, path):
-        pageTable = []
-        for frameId in availableFrames:
-            pageTable.append(frameId)
-            offset = 0
-            logicalAddress = (len(pageTable) - 1) * self._frameSize  + offset
-            while(offset < self._frameSize and logicalAddress < progSize):
-                inst = program.instructions[logicalAddress]
-                physicalAddress = frameId * self._frameSize + offset
-                log.logger.info("Se va a cargar la instruccion {l} en {p}".format(l = logicalAddress, p = physicalAddress))
-                HARDWARE.memory.write(physicalAddress, inst)
-                offset += 1
-                logicalAddress = (len(pageTable) - 1) * self._frameSize  + offset
-        log.logger.info("\n Finished loading program: {name}".format(name=path))
-        return pageTable
+        self._memory = memory
 
     def load(self, path):
         program = self._fileSystem.read(path)
+        if (program is None):
+            log.loader.info("\n Program: %s couldn't be loaded", path)
+            return -1
         progSize = len(program.instructions)
         pagesQuantity = progSize // self._frameSize
         if (progSize % self._frameSize > 0):
             pagesQuantity += 1
-        availableFrames = self._memoryManager.allocFrames(pagesQuantity)
-        if (not availableFrames):
-            log.logger.info("\n Program: {name} couldn't be loaded".format(name=path))
-            return -1       
-        return self.__createPageTable(availableFrames, program, progSize, path)
+        log.loader.info("\n Finished loading program: %s", path)
+        return PageTable(pagesQuantity)
+
+    ## carga la pagina pageId del programa del pcb en un frame libre (o en el de una pagina desalojada).
+    ## Si la pagina se desalojo modificada se trae del area de swap, si no del programa en el FileSystem
+    def loadPage(self, pcb, pageId):
+        frameId = self._memoryManager.allocPage(pcb, pageId)
+        if (frameId is None):
+            return False
+        entry = pcb.pageTable.entry(pageId)
+        logicalAddress = pageId * self._frameSize
+        if entry.swapSlot is not None:
+            log.loader.debug("Swap in: page %s of %s from slot %s", pageId, pcb.path, entry.swapSlot)
+            page = self._memoryManager.swapArea.read(entry.swapSlot)
+        else:
+            program = self._fileSystem.read(pcb.path)
+            ## se carga la pagina completa de una vez, expandiendo solo sus instrucciones
+            page = program.instructions.slice(logicalAddress, logicalAddress + self._frameSize)
+        physicalAddress = frameId * self._frameSize
+        if log.loader.isEnabledFor(logging.DEBUG):
+            for offset in range(len(page)):
+                log.loader.debug("Se va a cargar la instruccion %s en %s", logicalAddress + offset, physicalAddress + offset)
+        self._memory.writeBlock(physicalAddress, page)
+        entry.frame = frameId
+        entry.valid = True
+        entry.referenced = False
+        entry.dirty = False
+        return True
 
     @property
     def memoryManager(self):
         return self._memoryManager
 
+## coreId: el core que agrega o pide un proceso (solo lo usan los schedulers con una cola por core)
 class Scheduler():
     def __init__(self):
         self._readyQueue = []
 
-    def add(self, pcb):
+    def add(self, pcb, coreId = None):
         log.logger.error("-- METHOD add() MUST BE OVERRIDEN in class {classname}".format(classname=self.__class__.__name__))
 
-    def getNext(self):
+    def getNext(self, coreId = None):
         log.logger.error("-- METHOD getNext() MUST BE OVERRIDEN in class {classname}".format(classname=self.__class__.__name__))
 
-    def isReadyQueueEmpty(self):
+    ## el proximo que retornaria getNext, sin sacarlo de la cola
+    def peekNext(self):
+        log.logger.error("-- METHOD peekNext() MUST BE OVERRIDEN in class {classname}".format(classname=self.__class__.__name__))
+
+    ## el menos urgente de la cola (el ultimo que retornaria getNext), sin sacarlo
+    def peekLast(self):
+        log.logger.error("-- METHOD peekLast() MUST BE OVERRIDEN in class {classname}".format(classname=self.__class__.__name__))
+
+    ## saca el menos urgente de la cola y retorna su entrada, que se vuelve a encolar con addEntry
+    ## en otra cola del mismo tipo sin perder su lugar (orden de llegada, aging)
+    def popLast(self):
+        log.logger.error("-- METHOD popLast() MUST BE OVERRIDEN in class {classname}".format(classname=self.__class__.__name__))
+
+    def addEntry(self, entry):
+        log.logger.error("-- METHOD addEntry() MUST BE OVERRIDEN in class {classname}".format(classname=self.__class__.__name__))
+
+    def isReadyQueueEmpty(self, coreId = None):
         return len(self._readyQueue) == 0
+
+    def __len__(self):
+        return len(self._readyQueue)
     
-    def checkTick(self, kernel):
+    def checkTick(self, kernel, ticks = 1):
         pass
 
     def mustExpropiate(self, pcbInCPU, pcbToAdd):
         return False
+
+    ## el quantum que el Kernel le configura al Timer de cada core (None: sin timeout)
+    @property
+    def quantum(self):
+        return None
+
+    ## metricas propias del scheduler para el resumen de Statistics
+    def metrics(self):
+        return {}
     
 class SchedulerFCFS(Scheduler):
     def __init__(self):
         self._readyQueue = deque()
     
-    def add(self, pcb):
+    def add(self, pcb, coreId = None):
         self._readyQueue.append(pcb)
 
-    def getNext(self):
+    def getNext(self, coreId = None):
         return self._readyQueue.popleft()
 
-class SchedulerPriorityNoPreemptive(Scheduler):
+    def peekNext(self):
+        return self._readyQueue[0]
 
-    def __init__(self):
-        self._readyQueue = []
-        self._ages = {}
-        self._ticksToAge = TICKSTOAGE
-    
-    def add(self, pcb):
-        self._readyQueue.append(pcb)
-        self._ages[pcb.pid] = pcb.priority
+    def peekLast(self):
+        return self._readyQueue[-1]
+
+    def popLast(self):
+        return self._readyQueue.pop()
 
-    def getNext(self):
-        self._readyQueue.sort(key = lambda p : self._ages[p.pid])
-        return self._readyQueue.pop(0)
+    def addEntry(self, entry):
+        self._readyQueue.append(entry)
 
-    def checkTick(self, kernel):
-        if self._ticksToAge == 0:
-            for key in self._ages:
-                if kernel.pcbTable.get(key).state == State.READY and self._ages[key] > 0:
-                    self._ages[key] -= 1
+class SchedulerPriorityNoPreemptive(Scheduler):
 
-            self._ticksToAge = TICKSTOAGE
+    ## compartido entre instancias: con una cola por core, las entradas que se pasan de una
+    ## cola a otra (addEntry) tienen que seguir siendo comparables con las de la cola destino
+    _arrivals = count()
+
+    def __init__(self, ticksToAge = TICKSTOAGE):
+        ## envejecimiento lazy: cada ticksToAge ticks pasa una "ronda" de aging y cada
+        ## proceso en ready baja una unidad su prioridad (hasta 0). En lugar de recorrer
+        ## los procesos en cada ronda, la prioridad efectiva se calcula como
+        ##     max(0, prioridad + rondas al encolar - rondas actuales)
+        ## El heap se ordena por (prioridad + rondas al encolar, orden de llegada), que no
+        ## cambia con el tiempo; los que ya llegaron a 0 pasan a _agedQueue, ordenados
+        ## solo por orden de llegada (FIFO)
+        self._readyQueue = []
+        self._agedQueue = []
+        self._agingRounds = 0
+        self._agingPeriod = ticksToAge
+        self._ticksToAge = ticksToAge
+    
+    def add(self, pcb, coreId = None):
+        heappush(self._readyQueue, (pcb.priority + self._agingRounds, next(self._arrivals), pcb))
+
+    def getNext(self, coreId = None):
+        self._promoteAged()
+        if self._agedQueue:
+            return heappop(self._agedQueue)[1]
+        return heappop(self._readyQueue)[2]
+
+    def peekNext(self):
+        self._promoteAged()
+        if self._agedQueue:
+            return self._agedQueue[0][1]
+        return self._readyQueue[0][2]
+
+    def peekLast(self):
+        queue = self._lastQueue()
+        return queue[self._lastIndex(queue)][-1]
+
+    ## las rondas de aging de las colas de un PerCoreScheduler avanzan juntas, asi que la clave
+    ## de la entrada vale igual en la cola destino
+    def popLast(self):
+        queue = self._lastQueue()
+        index = self._lastIndex(queue)
+        entry = queue[index]
+        queue[index] = queue[-1]
+        queue.pop()
+        heapify(queue)
+        return entry
+
+    def addEntry(self, entry):
+        heappush(self._readyQueue if len(entry) == 3 else self._agedQueue, entry)
+
+    ## los de _readyQueue (ya promovidos los de prioridad efectiva 0) son menos urgentes que los de _agedQueue
+    def _lastQueue(self):
+        self._promoteAged()
+        return self._readyQueue if self._readyQueue else self._agedQueue
+
+    def _lastIndex(self, queue):
+        return max(range(len(queue)), key=lambda index: queue[index][:-1])
+
+    ## los que llegaron a prioridad efectiva 0 ya no se ordenan por prioridad
+    def _promoteAged(self):
+        while self._readyQueue and self._readyQueue[0][0] <= self._agingRounds:
+            _, arrival, pcb = heappop(self._readyQueue)
+            heappush(self._agedQueue, (arrival, pcb))
+
+    def isReadyQueueEmpty(self, coreId = None):
+        return len(self._readyQueue) == 0 and len(self._agedQueue) == 0
+
+    def __len__(self):
+        return len(self._readyQueue) + len(self._agedQueue)
+
+    def checkTick(self, kernel, ticks = 1):
+        ## solo se cuentan las rondas de aging que ocurren en los proximos `ticks` ticks
+        period = self._agingPeriod + 1
+        if ticks <= self._ticksToAge:
+            self._ticksToAge -= ticks
         else:
-            self._ticksToAge -= 1
+            rounds = (ticks - self._ticksToAge - 1) // period + 1
+            lastRoundTick = self._ticksToAge + (rounds - 1) * period
+            self._agingRounds += rounds
+            self._ticksToAge = self._agingPeriod - (ticks - lastRoundTick - 1)
 
 class SchedulerPriorityPreemptive(SchedulerPriorityNoPreemptive):
 
@@ -388,89 +793,920 @@ class SchedulerPriorityPreemptive(SchedulerPriorityNoPreemptive):
 
 class SchedulerRoundRobin(SchedulerFCFS):
 
-    def __init__(self):
+    def __init__(self, quantum = QUANTUM):
         super().__init__()
-        HARDWARE.timer.quantum = 4
+        self._quantum = quantum
+
+    @property
+    def quantum(self):
+        return self._quantum
+
+## una cola de ready por core, cada una un scheduler de schedulerClass (FCFS, prioridad, RR...).
+## Los procesos nuevos van a la cola mas corta de los cores de su afinidad y los expropiados vuelven
+## a la cola de su core. Un core sin procesos en su cola le roba el proximo a la cola mas larga que
+## tenga uno que pueda correr, y cada LOAD_BALANCE_PERIOD ticks se pasan procesos de las colas
+## mas largas a las mas cortas hasta que difieran en a lo sumo uno
+class PerCoreScheduler(Scheduler):
+
+    def __init__(self, schedulerClass, coresQuantity):
+        self._queues = [schedulerClass() for _ in range(coresQuantity)]
+        self._ticksToBalance = LOAD_BALANCE_PERIOD
+        self._steals = 0
+        self._balanceMigrations = 0
+        self._imbalanceTicks = 0
+        self._sampledTicks = 0
+        self._maxImbalance = 0
+
+    def add(self, pcb, coreId = None):
+        if coreId is None or not pcb.canRunOn(coreId):
+            coreId = self._shortestQueue(pcb)
+        self._queues[coreId].add(pcb)
+
+    def getNext(self, coreId = None):
+        if coreId is None:
+            coreId = self._longestQueue()
+        if self._queues[coreId].isReadyQueueEmpty():
+            victim = self._stealableQueue(coreId)
+            self._steals += 1
+            log.sched.info("Core %s steals %s from core %s", coreId, self._queues[victim].peekNext().path, victim)
+            return self._queues[victim].getNext()
+        return self._queues[coreId].getNext()
+
+    def peekNext(self):
+        return self._queues[self._longestQueue()].peekNext()
+
+    ## sin coreId: si no hay ningun proceso en ready; con coreId: si el core no tiene ninguno para correr
+    def isReadyQueueEmpty(self, coreId = None):
+        if coreId is None:
+            return all(queue.isReadyQueueEmpty() for queue in self._queues)
+        return self._queues[coreId].isReadyQueueEmpty() and self._stealableQueue(coreId) is None
+
+    def __len__(self):
+        return sum(len(queue) for queue in self._queues)
+
+    def mustExpropiate(self, pcbInCPU, pcbToAdd):
+        return self._queues[0].mustExpropiate(pcbInCPU, pcbToAdd)
+
+    @property
+    def quantum(self):
+        return self._queues[0].quantum
+
+    def checkTick(self, kernel, ticks = 1):
+        for queue in self._queues:
+            queue.checkTick(kernel, ticks)
+        imbalance = self._imbalance()
+        self._imbalanceTicks += imbalance * ticks
+        self._sampledTicks += ticks
+        self._maxImbalance = max(self._maxImbalance, imbalance)
+        self._ticksToBalance -= ticks
+        if self._ticksToBalance <= 0:
+            ## con varios ticks juntos (EventDrivenClock) el proximo balanceo se cuenta desde el
+            ## que tocaba, no desde el ultimo tick, igual que tick a tick
+            self._ticksToBalance = LOAD_BALANCE_PERIOD - (-self._ticksToBalance) % LOAD_BALANCE_PERIOD
+            self._balance()
+            self._wakeIdleCores(kernel)
+
+    ## los cores libres no piden procesos por su cuenta: si ahora tienen alguno para correr se les avisa
+    def _wakeIdleCores(self, kernel):
+        for coreId, runningPCB in enumerate(kernel.runningPCBs):
+            if runningPCB is None and not self.isReadyQueueEmpty(coreId):
+                kernel.hardware.interruptVector.handle(IRQ(RESCHEDULE_INTERRUPTION_TYPE, None, coreId))
+
+    def _imbalance(self):
+        lengths = [len(queue) for queue in self._queues]
+        return max(lengths) - min(lengths)
+
+    def _shortestQueue(self, pcb):
+        allowed = [coreId for coreId in range(len(self._queues)) if pcb.canRunOn(coreId)]
+        return min(allowed, key=lambda coreId: len(self._queues[coreId]))
+
+    def _longestQueue(self):
+        return max(range(len(self._queues)), key=lambda coreId: len(self._queues[coreId]))
+
+    ## la cola mas larga cuyo proximo proceso puede correr en el core (None si no hay)
+    def _stealableQueue(self, coreId):
+        candidates = sorted(range(len(self._queues)), key=lambda victim: -len(self._queues[victim]))
+        for victim in candidates:
+            if victim != coreId and not self._queues[victim].isReadyQueueEmpty() and self._queues[victim].peekNext().canRunOn(coreId):
+                return victim
+        return None
+
+    ## pasa el proceso menos urgente de la cola mas larga a la mas corta de su afinidad, mientras eso
+    ## reduzca la diferencia. La entrada conserva su lugar (orden de llegada, aging) en la cola destino
+    def _balance(self):
+        while True:
+            source = self._longestQueue()
+            if self._queues[source].isReadyQueueEmpty():
+                return
+            pcb = self._queues[source].peekLast()
+            target = self._shortestQueue(pcb)
+            if len(self._queues[source]) - len(self._queues[target]) <= 1:
+                return
+            self._queues[target].addEntry(self._queues[source].popLast())
+            self._balanceMigrations += 1
+            log.sched.info("Load balance: %s from core %s to core %s", pcb.path, source, target)
+
+    def metrics(self):
+        return {
+            'steals': self._steals,
+            'balanceMigrations': self._balanceMigrations,
+            'averageImbalance': self._imbalanceTicks / self._sampledTicks if self._sampledTicks else 0,
+            'maxImbalance': self._maxImbalance,
+        }
 
+## registra el diagrama de gantt como intervalos de estado por proceso (run-length):
+## solo se guarda algo cuando un proceso cambia de estado. Si se indica un path, los
+## intervalos ya cerrados se escriben en ese archivo de a chunkSize, asi la memoria usada
+## no crece con la duracion de la corrida. La tabla se arma solo cuando se pide (render)
 class GanttDiagram():
     
-    def __init__(self, pcbTable):
+    def __init__(self, pcbTable, clock, crontab, path = None, chunkSize = GANTT_CHUNK_SIZE):
         self._pcbTable = pcbTable
-        self._ticksRegisters = []
+        self._clock = clock
+        self._crontab = crontab
         self._isOn = True
-
-    def checkTick(self):
+        self._firstTick = None
+        self._lastTick = None
+        self._openIntervals = {}
+        self._closedIntervals = []
+        self._path = path
+        self._chunkSize = chunkSize
+        ## procesos que cambiaron de estado desde el ultimo tick registrado
+        self._changedPCBs = {}
+        self._pcbTable.addStateListener(self)
+        if self._path:
+            open(self._path, 'w').close()
+
+    ## ticks: cantidad de ticks consecutivos (a partir del actual) en los que no cambia ningun estado
+    def checkTick(self, ticks = 1):
         if (self._isOn):
-            currentTickData = {"tick" : HARDWARE.clock.currentTick}
-            currentTickData.update(self._pcbTable.getAll())
-            self._ticksRegisters.append(currentTickData)
+            firstTick = self._clock.currentTick
+            ## sin procesos todavia (por ejemplo si todos llegan por el Crontab) no hay nada que cerrar,
+            ## y si quedan jobs por llegar el diagrama sigue en los ticks sin procesos
+            allTerminated = (len(self._pcbTable) > 0 and self._pcbTable.allTerminated()
+                             and not self._crontab.hasPendingJobs())
+            if allTerminated:
+                ## solo se registra el tick en el que se detecta el final
+                ticks = 1
+            if self._firstTick is None:
+                self._firstTick = firstTick
+            self._lastTick = firstTick + ticks - 1
+            for pcb in self._changedPCBs.values():
+                self._record(pcb.pid, pcb.state, firstTick)
+            self._changedPCBs.clear()
             # If every process has ended
-            if all(state == State.TERMINATED for state in self._pcbTable.getAll().values()):
-                self.printGanttDiagram(currentTickData.keys())
+            if allTerminated:
+                self.printGanttDiagram()
                 self._isOn = False
 
-    def printGanttDiagram(self, headers):
+    @property
+    def isOn(self):
+        return self._isOn
+
+    def stateChanged(self, pcb, oldState, newState):
+        if self._isOn:
+            self._changedPCBs[pcb.pid] = pcb
+
+    def _record(self, pid, state, tickNbr):
+        interval = self._openIntervals.get(pid)
+        if interval is None:
+            self._openIntervals[pid] = [tickNbr, state]
+        elif interval[1] != state:
+            self._closeInterval(pid, interval[0], tickNbr - 1, interval[1])
+            self._openIntervals[pid] = [tickNbr, state]
+
+    def _closeInterval(self, pid, startTick, endTick, state):
+        self._closedIntervals.append((pid, startTick, endTick, state))
+        if self._path and len(self._closedIntervals) >= self._chunkSize:
+            self._flush()
+
+    def _flush(self):
+        with open(self._path, 'a') as file:
+            for pid, startTick, endTick, state in self._closedIntervals:
+                file.write("{pid},{start},{end},{state}\n".format(pid=pid, start=startTick, end=endTick, state=state.value))
+        self._closedIntervals = []
+
+    ## todos los intervalos registrados (pid, tick inicial, tick final, estado)
+    def intervals(self):
+        if self._path:
+            with open(self._path) as file:
+                for line in file:
+                    pid, startTick, endTick, state = map(int, line.split(','))
+                    yield pid, startTick, endTick, State(state)
+        yield from self._closedIntervals
+        for pid, (startTick, state) in self._openIntervals.items():
+            yield pid, startTick, self._lastTick, state
+
+    def render(self):
         stateNotation = {
             State.READY : '*',
             State.WAITING : 'W',
             State.TERMINATED : '-',
             State.RUNNING: 'R'
         }
-        rows = []
-        for tick in self._ticksRegisters:
-            row = [stateNotation.get(value, value) for value in tick.values()]
-            rows.append(row)
-        
-        log.logger.info(tabulate(rows, headers=headers, tablefmt="grid"))
+        if self._firstTick is None:
+            return ""
+        pids = sorted(self._openIntervals)
+        columns = {pid: column for column, pid in enumerate(pids, 1)}
+        rows = [[tickNbr] + [''] * len(pids) for tickNbr in range(self._firstTick, self._lastTick + 1)]
+        for pid, startTick, endTick, state in self.intervals():
+            for tickNbr in range(startTick, endTick + 1):
+                rows[tickNbr - self._firstTick][columns[pid]] = stateNotation.get(state, state)
+        return tabulate(rows, headers=["tick"] + pids, tablefmt="grid")
+
+    def printGanttDiagram(self):
+        if log.logger.isEnabledFor(logging.INFO):
+            log.logger.info(self.render())
+
+## subsistema de estadisticas: el CPU lo llama directamente al comienzo de cada ciclo (sin
+## pasar por el InterruptVector) y en cada tick hace el aging del scheduler, registra el
+## diagrama de gantt y acumula las metricas de cada proceso. Las metricas se actualizan
+## solo con los procesos que cambiaron de estado, asi cada tick cuesta O(cambios)
+class Statistics():
+
+    def __init__(self, kernel):
+        self._kernel = kernel
+        self._processes = {}
+        self._changedPCBs = {}
+        self._firstTick = None
+        self._lastTick = None
+        self._busyTicks = 0
+        self._finished = False
+        ## secuencia de referencias (pid, pagina) para comparar los algoritmos de reemplazo, si se pide
+        self._recordPageReferences = False
+        self._pageReferences = []
+        self._pageAccesses = 0
+        self._migrations = 0
+        kernel.pcbTable.addStateListener(self)
+
+    @property
+    def kernel(self):
+        return self._kernel
+
+    @property
+    def recordPageReferences(self):
+        return self._recordPageReferences
+
+    @recordPageReferences.setter
+    def recordPageReferences(self, record):
+        self._recordPageReferences = record
+
+    @property
+    def pageReferences(self):
+        return self._pageReferences
+
+    ## True cuando ya se registro el final de la corrida (y se imprimio el resumen)
+    @property
+    def finished(self):
+        return self._finished
+
+    ## un proceso paso a correr en un core distinto del ultimo en el que corrio
+    def countMigration(self):
+        self._migrations += 1
+
+    def tick(self, tickNbr):
+        self._sample(tickNbr, 1)
+        if self._recordPageReferences:
+            for coreId, pcb in enumerate(self.kernel.runningPCBs):
+                if pcb:
+                    self._recordPageReference(pcb, self.kernel.hardware.cores[coreId])
+
+    ## la pagina que el cpu va a leer en este tick; las referencias consecutivas a la misma pagina
+    ## no cambian los page faults de ningun algoritmo, asi que se guardan una sola vez
+    def _recordPageReference(self, pcb, core):
+        self._pageAccesses += 1
+        reference = (pcb.pid, core.cpu.pc // core.mmu.frameSize)
+        if not self._pageReferences or self._pageReferences[-1] != reference:
+            self._pageReferences.append(reference)
+
+    def skipTicks(self, fromTick, count):
+        self._sample(fromTick, count)
+
+    def stateChanged(self, pcb, oldState, newState):
+        self._changedPCBs[pcb.pid] = pcb
+
+    def _sample(self, firstTick, ticks):
+        self.kernel.scheduler.checkTick(self.kernel, ticks)
+        self.kernel.ganttDiagram.checkTick(ticks)
+        if self._firstTick is None:
+            self._firstTick = firstTick
+        for pcb in self._changedPCBs.values():
+            self._record(pcb, firstTick)
+        self._changedPCBs.clear()
+        self._lastTick = firstTick + ticks - 1
+        ## ticks de CPU ocupados, sumando todos los cores
+        self._busyTicks += ticks * self.kernel.pcbTable.countInState(State.RUNNING)
+        ## terminaron todos los procesos y no quedan jobs por llegar (puede haber ticks sin procesos entre jobs)
+        if (not self._finished and len(self.kernel.pcbTable) > 0 and self.kernel.pcbTable.allTerminated()
+                and not self.kernel.crontab.hasPendingJobs()):
+            self._finished = True
+            self.printSummary()
+
+    def _record(self, pcb, tickNbr):
+        process = self._processes.get(pcb.pid)
+        if process is None:
+            process = {'path': pcb.path, 'arrival': tickNbr, 'firstRun': None, 'terminated': None,
+                       'state': pcb.state, 'since': tickNbr, 'ticks': {state: 0 for state in State}}
+            self._processes[pcb.pid] = process
+        elif process['state'] != pcb.state:
+            process['ticks'][process['state']] += tickNbr - process['since']
+            process['state'] = pcb.state
+            process['since'] = tickNbr
+        if pcb.state == State.RUNNING and process['firstRun'] is None:
+            process['firstRun'] = tickNbr
+        if pcb.state == State.TERMINATED:
+            process['terminated'] = tickNbr
+
+    ## metricas de cada proceso (en ticks)
+    def processSummary(self, pid):
+        process = self._processes[pid]
+        ticks = dict(process['ticks'])
+        ticks[process['state']] += self._lastTick + 1 - process['since']
+        turnaround = None
+        if process['terminated'] is not None:
+            turnaround = process['terminated'] - process['arrival']
+        response = None
+        if process['firstRun'] is not None:
+            response = process['firstRun'] - process['arrival']
+        return {'pid': pid, 'path': process['path'], 'arrival': process['arrival'],
+                'waiting': ticks[State.READY], 'running': ticks[State.RUNNING], 'io': ticks[State.WAITING],
+                'response': response, 'turnaround': turnaround}
+
+    ## resumen de la corrida, para comparar schedulers numericamente
+    def summary(self):
+        processes = [self.processSummary(pid) for pid in sorted(self._processes)]
+        finished = [process for process in processes if process['turnaround'] is not None]
+        started = [process for process in processes if process['response'] is not None]
+        ## la corrida abarca desde el primer tick registrado hasta que termino el ultimo proceso
+        lastTick = max((process['arrival'] + process['turnaround'] for process in finished), default=self._lastTick)
+        elapsedTicks = 0 if self._firstTick is None else lastTick - self._firstTick
+        hardware = self.kernel.hardware
+        cores = len(hardware.cores)
+        references = sum(core.mmu.references for core in hardware.cores)
+        tlbHits = sum(core.mmu.tlb.hits for core in hardware.cores)
+        tlbMisses = sum(core.mmu.tlb.misses for core in hardware.cores)
+        return {
+            'processes': processes,
+            'ticks': elapsedTicks,
+            'cores': cores,
+            'cpuUtilization': self._busyTicks / (elapsedTicks * cores) if elapsedTicks else 0,
+            'throughput': len(finished) / elapsedTicks if elapsedTicks else 0,
+            'averageWaiting': self._average(processes, 'waiting'),
+            'averageResponse': self._average(started, 'response'),
+            'averageTurnaround': self._average(finished, 'turnaround'),
+            'pageFaults': self.kernel.memoryManager.pageFaults,
+            'pageFaultRate': self.kernel.memoryManager.pageFaults / references if references else 0,
+            'tlbHits': tlbHits,
+            'tlbMisses': tlbMisses,
+            'tlbHitRatio': tlbHits / (tlbHits + tlbMisses) if tlbHits + tlbMisses else 0,
+            'migrations': self._migrations,
+            'scheduler': self.kernel.scheduler.metrics(),
+            'ioDevices': {deviceId: {'requests': controller.requests, 'averageWait': controller.averageWait,
+                                     'maxWait': controller.maxWait, 'seekDistance': controller.device.seekDistance}
+                          for deviceId, controller in self.kernel.ioDeviceControllers.items()},
+        }
+
+    ## tasa de page faults de cada algoritmo de reemplazo sobre las referencias registradas
+    ## (por defecto con la cantidad de frames de la memoria)
+    def pageFaultRates(self, framesQuantity = None):
+        if framesQuantity is None:
+            framesQuantity = self.kernel.hardware.memory.size // self.kernel.hardware.mmu.frameSize
+        return pageFaultRates(self._pageReferences, framesQuantity, self._pageAccesses)
+
+    def _average(self, processes, metric):
+        return sum(process[metric] for process in processes) / len(processes) if processes else 0
+
+    def render(self):
+        summary = self.summary()
+        headers = ['pid', 'path', 'arrival', 'waiting', 'running', 'io', 'response', 'turnaround']
+        rows = [[process[header] for header in headers] for process in summary['processes']]
+        table = tabulate(rows, headers=headers, tablefmt="grid")
+        totals = "ticks: {ticks}, cores: {cores}, cpu utilization: {cpu:.2%}, throughput: {throughput:.3f} procs/tick\n" \
+                 "average waiting: {waiting:.2f}, average response: {response:.2f}, average turnaround: {turnaround:.2f}".format(
+                    ticks=summary['ticks'], cores=summary['cores'], cpu=summary['cpuUtilization'], throughput=summary['throughput'],
+                    waiting=summary['averageWaiting'], response=summary['averageResponse'], turnaround=summary['averageTurnaround'])
+        totals += "\npage faults: {pageFaults}, page fault rate: {rate:.2%}".format(pageFaults=summary['pageFaults'], rate=summary['pageFaultRate'])
+        totals += "\ntlb hits: {hits}, tlb misses: {misses}, tlb hit ratio: {ratio:.2%}".format(
+            hits=summary['tlbHits'], misses=summary['tlbMisses'], ratio=summary['tlbHitRatio'])
+        totals += "\nmigrations: {migrations}".format(migrations=summary['migrations'])
+        for metric, value in summary['scheduler'].items():
+            totals += ", {metric}: {value}".format(metric=metric, value=round(value, 2))
+        for deviceId, device in summary['ioDevices'].items():
+            totals += "\n{deviceId}: {requests} requests, average wait: {wait:.2f}, max wait: {maxWait}, seek distance: {seek}".format(
+                deviceId=deviceId, requests=device['requests'], wait=device['averageWait'], maxWait=device['maxWait'], seek=device['seekDistance'])
+        if self._pageReferences:
+            rates = self.pageFaultRates()
+            totals += "\npage fault rate by algorithm: " + ", ".join("{name}: {rate:.2%}".format(name=name, rate=rate) for name, rate in rates.items())
+        return "{table}\n{totals}".format(table=table, totals=totals)
+
+    def printSummary(self):
+        if log.logger.isEnabledFor(logging.INFO):
+            log.logger.info("\n Statistics:\n%s", self.render())
+
+## un job del Crontab: correr el programa `path` en el tick `tickNbr`
+CronJob = namedtuple('CronJob', ['tickNbr', 'path', 'priority', 'affinity'], defaults=[ALL_CORES])
 
 class Crontab():
 
     def __init__(self, kernel):
+        ## tick -> jobs de ese tick (puede haber varios en el mismo tick),
+        ## y un heap con esos ticks para encontrar el proximo sin recorrerlos todos
         self._jobs = {}
+        self._jobTicks = []
+        ## jobs que se leen de a uno a medida que el clock los alcanza (ver addJobs)
+        self._stream = None
+        self._nextStreamJob = None
+        ## los iterables recibidos en addJobs, para cerrarlos (por ejemplo un archivo abierto) en close
+        self._streams = []
         self._kernel = kernel
-        HARDWARE.clock.addSubscriber(self)
-
-    def add_job(self, tickNbr, path, priority):
-        job = {'path': path, 'priority': priority}
-        self._jobs[tickNbr] = job
-        log.logger.info("Crontab: add job {job} to Tick {tickNbr} ".format(job = job, tickNbr = tickNbr))
+        kernel.hardware.clock.addSubscriber(self)
+
+    def add_job(self, tickNbr, path, priority, affinity = ALL_CORES):
+        job = CronJob(tickNbr, path, priority, affinity)
+        if tickNbr not in self._jobs:
+            self._jobs[tickNbr] = []
+            heappush(self._jobTicks, tickNbr)
+        self._jobs[tickNbr].append(job)
+        log.sched.info("Crontab: add job %s to Tick %s ", job, tickNbr)
+
+    ## jobs: iterable de CronJob ordenados por tick, que se consume lazy: solo se tiene
+    ## en memoria el proximo job (para trazas grandes que no entran enteras en memoria).
+    ## Si ya habia otro stream pendiente, se intercalan por tick
+    def addJobs(self, jobs):
+        self._streams.append(jobs)
+        if self._nextStreamJob is not None:
+            jobs = merge(chain([self._nextStreamJob], self._stream), jobs, key=lambda job: job.tickNbr)
+        self._stream = iter(jobs)
+        self._nextStreamJob = next(self._stream, None)
 
     def tick(self, tickNbr):
-        job = self._jobs.get(tickNbr)
-        if job != None:
-            log.logger.info("Tick {tickNbr} - Running job: {job}".format(job = job, tickNbr = tickNbr))
+        ## tambien los jobs agregados para un tick que ya paso
+        while self._jobTicks and self._jobTicks[0] <= tickNbr:
+            for job in self._jobs.pop(heappop(self._jobTicks)):
+                log.sched.info("Tick %s - Running job: %s", tickNbr, job)
+                self.run_job(job)
+        while self._nextStreamJob is not None and self._nextStreamJob.tickNbr <= tickNbr:
+            job = self._nextStreamJob
+            log.sched.info("Tick %s - Running job: %s", tickNbr, job)
             self.run_job(job)
+            self._nextStreamJob = next(self._stream, None)
 
     def run_job(self, job):
-        path = job['path']
-        priority = job['priority']
-        self._kernel.run(path, priority)
+        self._kernel.run(job.path, job.priority, job.affinity)
+
+    ## descarta los jobs de los streams que quedan sin leer y los cierra
+    def close(self):
+        for stream in self._streams:
+            if hasattr(stream, 'close'):
+                stream.close()
+        self._streams = []
+        self._stream = None
+        self._nextStreamJob = None
+
+    ## el proximo tick con un job programado (para el EventDrivenClock)
+    def nextEventTick(self, tickNbr):
+        nextTick = max(self._jobTicks[0], tickNbr) if self._jobTicks else None
+        if self._nextStreamJob is not None:
+            streamTick = max(self._nextStreamJob.tickNbr, tickNbr)
+            nextTick = streamTick if nextTick is None else min(nextTick, streamTick)
+        return nextTick
+
+    def skipTicks(self, fromTick, count):
+        pass
+
+    ## quedan jobs que todavia no se corrieron (los jobs de un tick se corren despues de que
+    ## ejecutan los CPUs de ese tick, asi que los del tick actual tambien cuentan)
+    def hasPendingJobs(self):
+        return len(self._jobTicks) > 0 or self._nextStreamJob is not None
 
 class MemoryManager():
 
-    def __init__(self, memorySize, kernel, frameSize):
+    def __init__(self, memorySize, kernel, frameSize, allocator = None, replacement = None, swapArea = None):
         self._kernel = kernel
         self._memorySize = memorySize
         self._freeSize = memorySize
         self._frameSize = frameSize
-        self._frames = list(range(memorySize // frameSize))
+        framesQuantity = memorySize // frameSize
+        self._allocator = allocator if allocator else FifoFrameAllocator(framesQuantity)
+        ## sin algoritmo de reemplazo, cuando no hay frames libres la pagina no se puede cargar
+        self._replacement = replacement
+        if swapArea is None and replacement is not None:
+            swapArea = SwapArea(frameSize)
+        self._swapArea = swapArea
+        ## LRU necesita enterarse de cada acceso que hace el MMU de cualquier core
+        if replacement is not None and replacement.tracksReferences:
+            for core in kernel.hardware.cores:
+                core.mmu.referenceListener = replacement
+        ## frameId -> (pcb, pageId) de las paginas cargadas con allocPage
+        self._owners = dict()
+        self._pageFaults = 0
+        self._evictions = 0
+        self._swapOuts = 0
 
     def allocFrames(self, quantity):
-        if (quantity > len(self._frames)):
-            log.logger.info("There's not enough frames available")
+        if (quantity > self._allocator.freeCount):
+            log.loader.info("There's not enough frames available")
             return False
-        allocatedFrames, self._frames = self._frames[:quantity], self._frames[quantity:]
+        allocatedFrames = self._allocator.alloc(quantity)
         self._freeSize -= len(allocatedFrames) * self._frameSize
         return allocatedFrames
     
     def freeFrames(self, framesToFree):
         self._freeSize += len(framesToFree) * self._frameSize
-        self._frames.extend(framesToFree)
+        for frameId in framesToFree:
+            if self._owners.pop(frameId, None) is not None and self._replacement:
+                self._replacement.freed(frameId)
+        self._allocator.free(framesToFree)
+
+    ## frame para la pagina pageId del pcb (un page fault): uno libre o, si no hay, el de una pagina victima
+    def allocPage(self, pcb, pageId):
+        self._pageFaults += 1
+        if self._allocator.freeCount > 0:
+            frameId = self.allocFrames(1)[0]
+        elif self._replacement:
+            frameId = self._evict()
+        else:
+            log.loader.info("There's not enough frames available")
+            return None
+        self._owners[frameId] = (pcb, pageId)
+        if self._replacement:
+            self._replacement.loaded(frameId, pcb.pageTable.entry(pageId))
+        return frameId
+
+    ## libera los frames y los slots de swap de un proceso
+    def freePages(self, pageTable):
+        self.freeFrames(pageTable.frames())
+        if self._swapArea:
+            for entry in pageTable.entries():
+                if entry.swapSlot is not None:
+                    self._swapArea.free(entry.swapSlot)
+                    entry.swapSlot = None
+
+    ## desaloja la pagina victima; si fue modificada se guarda en el area de swap
+    def _evict(self):
+        frameId = self._replacement.victim()
+        pcb, pageId = self._owners.pop(frameId)
+        entry = pcb.pageTable.get(pageId)
+        if entry.dirty:
+            if entry.swapSlot is not None:
+                self._swapArea.free(entry.swapSlot)
+            page = self._kernel.hardware.memory.readBlock(frameId * self._frameSize, self._frameSize)
+            entry.swapSlot = self._swapArea.write(page)
+            entry.dirty = False
+            self._swapOuts += 1
+            log.mmu.debug("Swap out: page %s of %s to slot %s", pageId, pcb.path, entry.swapSlot)
+        entry.valid = False
+        ## la pagina puede estar en la TLB de cualquier core
+        for core in self._kernel.hardware.cores:
+            core.mmu.invalidatePage(pcb.pid, pageId)
+        self._evictions += 1
+        log.mmu.info("Evicted page %s of %s from frame %s", pageId, pcb.path, frameId)
+        return frameId
+
+    @property
+    def swapArea(self):
+        return self._swapArea
+
+    def close(self):
+        if self._swapArea:
+            self._swapArea.close()
+
+    @property
+    def pageFaults(self):
+        return self._pageFaults
+
+    @property
+    def evictions(self):
+        return self._evictions
+
+    ## paginas desalojadas modificadas (guardadas en el area de swap)
+    @property
+    def swapOuts(self):
+        return self._swapOuts
 
     @property
     def kernel(self):
         return self._kernel
-    
+
+## area de swap simulada en un archivo local (temporal si no se indica path):
+## cada pagina ocupa un slot de frameSize bytes y los slots liberados se reusan.
+## El archivo se abre con la primera pagina que se guarda y se cierra con close (en Kernel.shutdown)
+class SwapArea():
+
+    def __init__(self, frameSize, path = None):
+        self._frameSize = frameSize
+        self._path = path
+        self._file = None
+        self._slotsQuantity = 0
+        self._freeSlots = []
+
+    def write(self, page):
+        if self._file is None:
+            self._file = open(self._path, 'w+b') if self._path else tempfile.TemporaryFile()
+        if self._freeSlots:
+            slot = self._freeSlots.pop()
+        else:
+            slot = self._slotsQuantity
+            self._slotsQuantity += 1
+        self._file.seek(slot * self._frameSize)
+        self._file.write(bytes(page))
+        return slot
+
+    def read(self, slot):
+        self._file.seek(slot * self._frameSize)
+        return bytearray(self._file.read(self._frameSize))
+
+    def free(self, slot):
+        self._freeSlots.append(slot)
+
+    @property
+    def usedSlots(self):
+        return self._slotsQuantity - len(self._freeSlots)
+
+    @property
+    def isOpen(self):
+        return self._file is not None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+## elige la pagina a desalojar cuando no quedan frames libres.
+## Las paginas cargadas se registran con loaded(frameId, entry) y las liberadas con freed(frameId);
+## las estructuras de cada algoritmo descartan en forma perezosa los frames que ya no son de esa entrada.
+## Los algoritmos con tracksReferences reciben ademas referenced(frameId) en cada acceso a memoria
+class PageReplacementAlgorithm():
+
+    def __init__(self):
+        self._residents = dict()
+
+    @property
+    def tracksReferences(self):
+        return False
+
+    def loaded(self, frameId, entry):
+        self._residents[frameId] = entry
+        self._loaded(frameId, entry)
+
+    def freed(self, frameId):
+        del self._residents[frameId]
+        self._freed(frameId)
+
+    def referenced(self, frameId):
+        pass
+
+    def victim(self):
+        frameId = self._victim()
+        del self._residents[frameId]
+        return frameId
+
+    def _isResident(self, frameId, entry):
+        return self._residents.get(frameId) is entry
+
+    def _loaded(self, frameId, entry):
+        pass
+
+    def _freed(self, frameId):
+        pass
+
+    def _victim(self):
+        pass
+
+## desaloja la pagina que hace mas tiempo que se cargo
+class FifoReplacement(PageReplacementAlgorithm):
+
+    def __init__(self):
+        super().__init__()
+        self._queue = deque()
+
+    def _loaded(self, frameId, entry):
+        self._queue.append((frameId, entry))
+
+    def _victim(self):
+        while True:
+            frameId, entry = self._queue.popleft()
+            if self._isResident(frameId, entry):
+                return frameId
+
+## FIFO que le da una segunda oportunidad a las paginas con el bit referenced (clock)
+class SecondChanceReplacement(FifoReplacement):
+
+    def _victim(self):
+        while True:
+            frameId, entry = self._queue.popleft()
+            if not self._isResident(frameId, entry):
+                continue
+            if not entry.referenced:
+                return frameId
+            entry.referenced = False
+            self._queue.append((frameId, entry))
+
+## desaloja la pagina usada hace mas tiempo: los frames se mantienen ordenados del acceso
+## mas viejo al mas reciente, moviendo al final el frame de cada acceso
+class LruReplacement(PageReplacementAlgorithm):
+
+    def __init__(self):
+        super().__init__()
+        self._order = OrderedDict()
+
+    @property
+    def tracksReferences(self):
+        return True
+
+    def _loaded(self, frameId, entry):
+        self._order[frameId] = None
+        self._order.move_to_end(frameId)
+
+    def _freed(self, frameId):
+        del self._order[frameId]
+
+    def referenced(self, frameId):
+        if frameId in self._order:
+            self._order.move_to_end(frameId)
+
+    def _victim(self):
+        frameId, _ = self._order.popitem(last=False)
+        return frameId
+
+## desaloja la pagina que se va a usar mas tarde. Necesita conocer de antemano la secuencia de
+## referencias, asi que solo sirve para simular una secuencia registrada (simulatePageFaults)
+class OptimalReplacement(PageReplacementAlgorithm):
+
+    def __init__(self, references):
+        super().__init__()
+        ## _nextUse[i]: la proxima posicion en la que se vuelve a referenciar la pagina de la posicion i
+        self._nextUse = [len(references)] * len(references)
+        nextPosition = dict()
+        for position in range(len(references) - 1, -1, -1):
+            self._nextUse[position] = nextPosition.get(references[position], len(references))
+            nextPosition[references[position]] = position
+        ## heap de (-proximo uso, posicion del acceso, frame): cada acceso agrega una entrada
+        ## y las que quedaron viejas (la pagina se volvio a usar o se desalojo) se descartan al buscar la victima
+        self._nextUses = []
+
+    @property
+    def tracksReferences(self):
+        return True
+
+    def referenced(self, frameId):
+        position = self._residents[frameId].lastReference
+        heappush(self._nextUses, (-self._nextUse[position], position, frameId))
+
+    def _victim(self):
+        while True:
+            _, position, frameId = heappop(self._nextUses)
+            entry = self._residents.get(frameId)
+            if entry is not None and entry.lastReference == position:
+                return frameId
+
+PAGE_REPLACEMENT_ALGORITHMS = {
+    'FIFO': lambda references: FifoReplacement(),
+    'LRU': lambda references: LruReplacement(),
+    'SecondChance': lambda references: SecondChanceReplacement(),
+    'Optimal': OptimalReplacement,
+}
+
+## cantidad de page faults de una secuencia de referencias a paginas con framesQuantity frames.
+## Las entradas se marcan como lo hace el MMU, usando la posicion en la secuencia como momento del acceso
+def simulatePageFaults(references, framesQuantity, algorithm):
+    entries = dict()
+    residents = dict()
+    freeFrames = list(range(framesQuantity - 1, -1, -1))
+    pageFaults = 0
+    for position, page in enumerate(references):
+        entry = entries.get(page)
+        if entry is None:
+            entry = PageTableEntry()
+            entries[page] = entry
+        if not entry.valid:
+            pageFaults += 1
+            if freeFrames:
+                frameId = freeFrames.pop()
+            else:
+                frameId = algorithm.victim()
+                residents.pop(frameId).valid = False
+            entry.frame = frameId
+            entry.valid = True
+            entry.referenced = False
+            residents[frameId] = entry
+            algorithm.loaded(frameId, entry)
+        entry.referenced = True
+        entry.lastReference = position
+        algorithm.referenced(entry.frame)
+    return pageFaults
+
+## tasa de page faults de cada algoritmo de reemplazo para la misma secuencia de referencias.
+## accesses es el total de accesos a memoria, si la secuencia no guarda los accesos repetidos a una misma pagina
+def pageFaultRates(references, framesQuantity, accesses = None):
+    if accesses is None:
+        accesses = len(references)
+    rates = dict()
+    for name, algorithmFactory in PAGE_REPLACEMENT_ALGORITHMS.items():
+        pageFaults = simulatePageFaults(references, framesQuantity, algorithmFactory(references))
+        rates[name] = pageFaults / accesses if accesses else 0
+    return rates
+
+## administra los frames libres con alloc(quantity) y free(frames); el costo de cada uno, y la
+## memoria que usa, depende de la subclase (ver cada una).
+## FifoFrameAllocator y LowestFrameFirstAllocator no guardan los frames que todavia nunca se
+## asignaron: son los de _nextUnused en adelante
+class FrameAllocator():
+
+    def __init__(self, framesQuantity):
+        self._framesQuantity = framesQuantity
+        self._nextUnused = 0
+        self._freeCount = framesQuantity
+
+    @property
+    def freeCount(self):
+        return self._freeCount
+
+    def alloc(self, quantity):
+        self._freeCount -= quantity
+        return self._alloc(quantity)
+
+    def free(self, frames):
+        self._freeCount += len(frames)
+        self._free(frames)
+
+    def _takeUnused(self, quantity):
+        frames = list(range(self._nextUnused, self._nextUnused + quantity))
+        self._nextUnused += quantity
+        return frames
+
+    def _alloc(self, quantity):
+        pass
+
+    def _free(self, frames):
+        pass
+
+## el orden original: primero los frames nunca usados, despues los liberados en el orden en que se liberaron.
+## alloc y free cuestan O(quantity), sin importar la cantidad total de frames
+class FifoFrameAllocator(FrameAllocator):
+
+    def __init__(self, framesQuantity):
+        super().__init__(framesQuantity)
+        self._freed = deque()
+
+    def _alloc(self, quantity):
+        unused = min(quantity, self._framesQuantity - self._nextUnused)
+        frames = self._takeUnused(unused)
+        for _ in range(quantity - unused):
+            frames.append(self._freed.popleft())
+        return frames
+
+    def _free(self, frames):
+        self._freed.extend(frames)
+
+## siempre asigna los frames libres de menor numero (heap de frames liberados).
+## alloc y free cuestan O(quantity * log(frames liberados))
+class LowestFrameFirstAllocator(FrameAllocator):
+
+    def __init__(self, framesQuantity):
+        super().__init__(framesQuantity)
+        self._freed = []
+
+    def _alloc(self, quantity):
+        ## los frames liberados siempre son menores que los nunca usados
+        frames = []
+        while self._freed and len(frames) < quantity:
+            frames.append(heappop(self._freed))
+        frames.extend(self._takeUnused(quantity - len(frames)))
+        return frames
+
+    def _free(self, frames):
+        for frame in frames:
+            heappush(self._freed, frame)
+
+## prefiere asignar frames contiguos: bitmap de frames libres (1 = libre) donde se busca una
+## corrida de `quantity` frames libres; si no la hay, asigna los libres de menor numero.
+## El bitmap tiene un byte por frame desde el principio, asi que la memoria usada es O(frames);
+## alloc cuesta O(frames) (recorre el bitmap, aunque con bytearray.find) y free O(quantity)
+class ContiguousFrameAllocator(FrameAllocator):
+
+    def __init__(self, framesQuantity):
+        super().__init__(framesQuantity)
+        self._bitmap = bytearray(b'\x01') * framesQuantity
+
+    def _alloc(self, quantity):
+        start = self._bitmap.find(b'\x01' * quantity)
+        if start != -1:
+            self._bitmap[start:start + quantity] = bytes(quantity)
+            return list(range(start, start + quantity))
+        frames = []
+        frame = 0
+        while len(frames) < quantity:
+            frame = self._bitmap.find(1, frame)
+            self._bitmap[frame] = 0
+            frames.append(frame)
+            frame += 1
+        return frames
+
+    def _free(self, frames):
+        for frame in frames:
+            self._bitmap[frame] = 1
+
 class FileSystem():
 
     def __init__(self):
@@ -482,68 +1718,192 @@ class FileSystem():
     def read(self, path):
         return self._fileSystem.get(path)
 
+## carga un workload desde un archivo de JSON lines, con una linea por programa o por job:
+##     {"program": "C:/prg1.exe", "instructions": [["CPU", 2], "IO", ["CPU", 3], "IO_DISK"]}
+##     {"run": "C:/prg1.exe", "tick": 0, "priority": 1}
+##     {"run": "C:/prg1.exe", "tick": 15, "priority": 3, "affinity": 3}
+## Una instruccion es el nombre de un opcode o [nombre, cantidad]; tick, priority y affinity son opcionales.
+## Los jobs tienen que estar ordenados por tick y cada programa definido antes de su primer job.
+## El archivo se lee a medida que el Crontab llega a los jobs: los programas se escriben en el
+## FileSystem al leerlos y de los jobs solo se tiene en memoria el proximo.
+## Las lineas vacias y las que empiezan con # se ignoran
+class WorkloadLoader():
+
+    def __init__(self, kernel):
+        self._kernel = kernel
+
+    ## valida el archivo entero antes de empezar, para que un error se informe aca (con el archivo
+    ## y la linea) y no en medio de la simulacion, dentro del thread del Clock
+    def load(self, path):
+        self.validate(path)
+        self._kernel.crontab.addJobs(self.jobs(path))
+
+    ## recorre el archivo sin guardarlo; ValueError en la primera linea invalida
+    def validate(self, path):
+        lastTick = 0
+        for lineNbr, entry in self._entries(path):
+            error = self._entryError(entry, lastTick)
+            if error:
+                raise ValueError("{path}:{lineNbr}: {error}".format(path=path, lineNbr=lineNbr, error=error))
+            if 'run' in entry:
+                lastTick = entry.get('tick', 0)
+
+    ## generador de los CronJob del archivo (cerrarlo cierra el archivo)
+    def jobs(self, path):
+        for lineNbr, entry in self._entries(path):
+            if 'program' in entry:
+                self._kernel.fileSystem.write(entry['program'], self.program(entry['instructions']))
+            else:
+                yield CronJob(entry.get('tick', 0), entry['run'], entry.get('priority', 0), entry.get('affinity', ALL_CORES))
+
+    def program(self, instructions):
+        return Program([InstructionRun(ASM.encode(i[0]), i[1]) if isinstance(i, list) else ASM.encode(i) for i in instructions])
+
+    def _entries(self, path):
+        with open(path) as workload:
+            for lineNbr, line in enumerate(workload, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as error:
+                    raise ValueError("{path}:{lineNbr}: {error}".format(path=path, lineNbr=lineNbr, error=error))
+                yield lineNbr, entry
+
+    ## el problema de una linea, o None si es valida
+    def _entryError(self, entry, lastTick):
+        if not isinstance(entry, dict):
+            return "expected a JSON object"
+        if 'program' in entry:
+            instructions = entry.get('instructions')
+            if not isinstance(entry['program'], str) or not isinstance(instructions, list):
+                return "a program needs a path and a list of instructions"
+            for instruction in instructions:
+                name, times = instruction if isinstance(instruction, list) and len(instruction) == 2 else (instruction, 1)
+                if not isinstance(name, str) or name not in INSTRUCTION_OPCODES or not isinstance(times, int) or times < 1:
+                    return "invalid instruction {instruction}".format(instruction=instruction)
+            return None
+        if not isinstance(entry.get('run'), str):
+            return "expected a 'program' or a 'run' entry"
+        for key in ['tick', 'priority', 'affinity']:
+            if not isinstance(entry.get(key, 0), int):
+                return "{key} must be an integer".format(key=key)
+        tick = entry.get('tick', 0)
+        if tick < 0:
+            return "negative tick {tick}".format(tick=tick)
+        if tick < lastTick:
+            return "job at tick {tick} after tick {lastTick}, jobs must be sorted by tick".format(tick=tick, lastTick=lastTick)
+        return None
+
 # emulates the core of an Operative System
+## el Kernel corre sobre el Hardware que recibe (por defecto la maquina global HARDWARE),
+## y se lo pasa a cada uno de sus componentes.
+## diskSchedulerClass: el IoScheduler de la cola de cada disco (FcfsIoScheduler, SstfIoScheduler,
+## ScanIoScheduler o CLookIoScheduler); los demas dispositivos atienden en orden de llegada.
+## ganttPath: el archivo donde el GanttDiagram va escribiendo los intervalos cerrados, de a
+## ganttChunkSize (sin ganttPath los guarda todos en memoria)
 class Kernel():
 
-    def __init__(self):
+    def __init__(self, hardware = None, frameSize = FRAME_SIZE, diskSchedulerClass = CLookIoScheduler,
+                 ganttPath = None, ganttChunkSize = GANTT_CHUNK_SIZE):
+        self._hardware = hardware if hardware else HARDWARE
+
         ## setup interruption handlers
         newHandler = NewInterruptionHandler(self)
-        HARDWARE.interruptVector.register(NEW_INTERRUPTION_TYPE, newHandler)
+        self._hardware.interruptVector.register(NEW_INTERRUPTION_TYPE, newHandler)
 
         killHandler = KillInterruptionHandler(self)
-        HARDWARE.interruptVector.register(KILL_INTERRUPTION_TYPE, killHandler)
+        self._hardware.interruptVector.register(KILL_INTERRUPTION_TYPE, killHandler)
 
         ioInHandler = IoInInterruptionHandler(self)
-        HARDWARE.interruptVector.register(IO_IN_INTERRUPTION_TYPE, ioInHandler)
+        self._hardware.interruptVector.register(IO_IN_INTERRUPTION_TYPE, ioInHandler)
 
         ioOutHandler = IoOutInterruptionHandler(self)
-        HARDWARE.interruptVector.register(IO_OUT_INTERRUPTION_TYPE, ioOutHandler)
+        self._hardware.interruptVector.register(IO_OUT_INTERRUPTION_TYPE, ioOutHandler)
 
         timeoutHandler = TimeOutInterruptionHandler(self)
-        HARDWARE.interruptVector.register(TIMEOUT_INTERRUPTION_TYPE, timeoutHandler)
+        self._hardware.interruptVector.register(TIMEOUT_INTERRUPTION_TYPE, timeoutHandler)
 
-        statInterruptionHandler = StatInterruptionHandler(self)
-        HARDWARE.interruptVector.register(STAT_INTERRUPTION_TYPE, statInterruptionHandler)
+        pageFaultHandler = PageFaultInterruptionHandler(self)
+        self._hardware.interruptVector.register(PAGE_FAULT_INTERRUPTION_TYPE, pageFaultHandler)
 
-        ## controls the Hardware's I/O Device
-        self._ioDeviceController = IoDeviceController(HARDWARE.ioDevice)
+        rescheduleHandler = RescheduleInterruptionHandler(self)
+        self._hardware.interruptVector.register(RESCHEDULE_INTERRUPTION_TYPE, rescheduleHandler)
 
-        self._runningPCB = None
+        ## controls the Hardware's I/O Devices: deviceId -> IoDeviceController (cada uno con su cola)
+        clock = self._hardware.clock
+        self._diskSchedulerClass = diskSchedulerClass
+        self._ioDeviceControllers = {}
+        for deviceId in self._hardware.ioDevices:
+            self.ioDeviceController(deviceId)
 
-        HARDWARE.mmu.frameSize = 4
+        ## el proceso corriendo en cada core (None si el core esta libre)
+        self._runningPCBs = [None] * len(self._hardware.cores)
+
+        for core in self._hardware.cores:
+            core.mmu.frameSize = frameSize
         self._pcbTable = PCBTable(self)
-        # self._memoryManager = MemoryManager(HARDWARE.memory.size, self, FirstFitAlgorithm()) #FirstFitAlgorithm
-        # self._memoryManager = MemoryManager(HARDWARE.memory.size, self, WorstFitAlgorithm()) #WorstFitAlgorithm
-        self._memoryManager = MemoryManager(HARDWARE.memory.size, self, HARDWARE.mmu.frameSize) #BestFitAlgorithm
+        memory = self._hardware.memory
+        framesQuantity = memory.size // frameSize
+        self._memoryManager = MemoryManager(memory.size, self, frameSize, FifoFrameAllocator(framesQuantity), FifoReplacement())
+        # self._memoryManager = MemoryManager(memory.size, self, frameSize, FifoFrameAllocator(framesQuantity), LruReplacement())
+        # self._memoryManager = MemoryManager(memory.size, self, frameSize, FifoFrameAllocator(framesQuantity), SecondChanceReplacement())
+        # self._memoryManager = MemoryManager(memory.size, self, frameSize, LowestFrameFirstAllocator(framesQuantity))
+        # self._memoryManager = MemoryManager(memory.size, self, frameSize, ContiguousFrameAllocator(framesQuantity))
         self._fileSystem = FileSystem()
-        self._loader = Loader(self._memoryManager, self._fileSystem, HARDWARE.mmu.frameSize)
-        self._dispatcher = Dispatcher()
-        HARDWARE.cpu.enable_stats = True
-        self._ganttDiagram = GanttDiagram(self._pcbTable)
-        # self._scheduler = SchedulerFCFS()
-        # self._scheduler = SchedulerPriorityNoPreemptive()
-        # self._scheduler = SchedulerPriorityPreemptive()
-        self._scheduler = SchedulerRoundRobin()
-
+        self._loader = Loader(self._memoryManager, self._fileSystem, frameSize, memory)
+        self._dispatcher = Dispatcher(self._hardware)
         self._crontab = Crontab(self)
+        self._ganttDiagram = GanttDiagram(self._pcbTable, clock, self._crontab, ganttPath, ganttChunkSize)
+        # self.scheduler = SchedulerFCFS()
+        # self.scheduler = SchedulerPriorityNoPreemptive()
+        # self.scheduler = SchedulerPriorityPreemptive()
+        self.scheduler = SchedulerRoundRobin()
+        ## con varios cores, una cola de ready por core:
+        # self.scheduler = PerCoreScheduler(SchedulerRoundRobin, len(self._hardware.cores))
+        self._statistics = Statistics(self)
+        ## el CPU del core 0 es el primero en ejecutar en cada tick, despues de los timeouts de todos los cores
+        self._hardware.cpu.statsListener = self._statistics
+
+        clock.addStopListener(self.shutdown)
+        ## si nadie configuro cuando detener el clock, se detiene al terminar la simulacion
+        ## (sin esto, en fast-forward el thread del clock giraria para siempre sin esperas)
+        if clock.stopCondition is None:
+            clock.stopCondition = self.hasFinished
 
     @property
-    def ioDeviceController(self):
-        return self._ioDeviceController
+    def ioDeviceControllers(self):
+        return self._ioDeviceControllers
+
+    ## el controller de un dispositivo; los que se conectan despues de crear el Kernel lo reciben la primera vez
+    def ioDeviceController(self, deviceId):
+        controller = self._ioDeviceControllers.get(deviceId)
+        if controller is None:
+            device = self._hardware.ioDevices[deviceId]
+            ioScheduler = self._diskSchedulerClass() if isinstance(device, DiskIODevice) else None
+            controller = IoDeviceController(device, self._hardware.clock, ioScheduler)
+            self._ioDeviceControllers[deviceId] = controller
+        return controller
 
     ## emulates a "system call" for programs execution
-    def run(self, path, priority):
-        parameters = {'path': path, 'priority': priority}
+    ## affinity: mascara de bits de los cores en los que puede correr (por ejemplo 0b101 = cores 0 y 2).
+    ## Con una sola cola de ready solo se respeta al elegir un core libre; PerCoreScheduler la respeta siempre
+    def run(self, path, priority, affinity = ALL_CORES):
+        parameters = {'path': path, 'priority': priority, 'affinity': affinity}
         newIRQ = IRQ(NEW_INTERRUPTION_TYPE, parameters)
-        HARDWARE.interruptVector.handle(newIRQ)
+        self._hardware.interruptVector.handle(newIRQ)
 
     @property
-    def runningPCB(self):
-        return self._runningPCB
+    def runningPCBs(self):
+        return self._runningPCBs
 
-    @runningPCB.setter
-    def runningPCB(self, pcb):
-        self._runningPCB = pcb
+    ## el primer core sin proceso (de los de la afinidad del pcb, si se indica), o None si estan todos ocupados
+    def idleCore(self, pcb = None):
+        for coreId, runningPCB in enumerate(self._runningPCBs):
+            if runningPCB is None and (pcb is None or pcb.canRunOn(coreId)):
+                return coreId
+        return None
 
     @property
     def pcbTable(self):
@@ -553,10 +1913,21 @@ class Kernel():
     def loader(self):
         return self._loader
 
+    @property
+    def hardware(self):
+        return self._hardware
+
     @property
     def scheduler(self):
         return self._scheduler
 
+    ## al cambiar de scheduler se reconfigura el Timer de cada core con su quantum
+    @scheduler.setter
+    def scheduler(self, scheduler):
+        self._scheduler = scheduler
+        for core in self._hardware.cores:
+            core.timer.quantum = scheduler.quantum
+
     @property
     def dispatcher(self):
         return self._dispatcher
@@ -564,6 +1935,10 @@ class Kernel():
     @property
     def ganttDiagram(self):
         return self._ganttDiagram
+
+    @property
+    def statistics(self):
+        return self._statistics
     
     @property
     def memoryManager(self):
@@ -577,5 +1952,15 @@ class Kernel():
     def fileSystem(self):
         return self._fileSystem
 
+    ## condicion de corte para el Clock: todos los procesos terminaron y no quedan jobs en el crontab,
+    ## y ya se registro el final en las estadisticas y en el diagrama de gantt
+    def hasFinished(self):
+        return self._statistics.finished and not self._ganttDiagram.isOn
+
+    ## libera lo que el Kernel tiene abierto; se llama cuando el Clock se detiene
+    def shutdown(self):
+        self._crontab.close()
+        self._memoryManager.close()
+
     def __repr__(self):
         return "Kernel "
\ No newline at end of file
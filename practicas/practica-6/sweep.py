@@ -0,0 +1,118 @@
+from hardware import *
+from so import *
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product, repeat
+from time import perf_counter
+import log
+import os
+import sys
+
+
+## barrido de parametros: corre el mismo workload con cada combinacion de la grilla,
+## una simulacion headless (clock por eventos y sin esperas) por proceso del pool,
+## y junta las metricas de Statistics en una sola tabla.
+##     python sweep.py [workers] [workload]
+## Cada simulacion arma su propio Hardware y su propio Kernel, asi que no comparten estado.
+## El workload es un archivo de JSON lines (ver WorkloadLoader): cada worker lo lee por su
+## cuenta, a medida que avanza su simulacion, en lugar de recibirlo entero del proceso principal
+
+DEFAULT_WORKLOAD = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workload.jsonl")
+
+## nombre -> clase del scheduler
+SCHEDULERS = {
+    'fcfs': SchedulerFCFS,
+    'rr': SchedulerRoundRobin,
+    'priority': SchedulerPriorityNoPreemptive,
+    'priorityPreemptive': SchedulerPriorityPreemptive,
+}
+
+## parametros de los constructores de los schedulers: cada punto tiene solo los del suyo
+SCHEDULER_PARAMETERS = ['quantum', 'ticksToAge']
+
+## 'scheduler' tiene su propia grilla por scheduler, con los parametros que ese scheduler lee,
+## y se cruza con el resto: (5 + 3) * 3 * 3 = 72 puntos
+PARAMETER_GRID = {
+    'scheduler': {
+        'rr': {'quantum': [1, 2, 3, 4, 8]},
+        'priorityPreemptive': {'ticksToAge': [2, 4, 8]},
+    },
+    'frameSize': [2, 4, 8],
+    'memorySize': [16, 32, 64],
+}
+
+## corte de seguridad: una simulacion que no termina en MAX_TICKS queda con finished = False
+MAX_TICKS = 100000
+
+## metricas del resumen de Statistics que van a la tabla
+METRICS = ['ticks', 'cpuUtilization', 'throughput', 'averageWaiting', 'averageResponse',
+           'averageTurnaround', 'pageFaults', 'pageFaultRate']
+
+
+## todas las combinaciones de la grilla, como diccionarios parametro -> valor
+def gridPoints(grid):
+    common = {name: values for name, values in grid.items() if name != 'scheduler'}
+    points = []
+    for scheduler, schedulerGrid in grid['scheduler'].items():
+        schedulerPoint = {'scheduler': [scheduler]}
+        schedulerPoint.update(schedulerGrid)
+        schedulerPoint.update(common)
+        names = list(schedulerPoint)
+        points.extend(dict(zip(names, values)) for values in product(*(schedulerPoint[name] for name in names)))
+    return points
+
+
+## corre el workload con los parametros de un punto de la grilla y retorna sus metricas
+def simulate(point, workload):
+    start = perf_counter()
+    hardware = Hardware()
+    hardware.setup(point['memorySize'], FAST_FORWARD_CLOCK_RATE, True)
+    kernel = Kernel(hardware, point['frameSize'])
+    kernel.scheduler = SCHEDULERS[point['scheduler']](**{name: point[name] for name in SCHEDULER_PARAMETERS if name in point})
+
+    WorkloadLoader(kernel).load(workload)
+
+    hardware.clock.stopCondition = lambda: kernel.hasFinished() or hardware.clock.currentTick >= MAX_TICKS
+    hardware.switchOn()
+    hardware.clock.join()
+
+    summary = kernel.statistics.summary()
+    result = dict(point)
+    result.update((metric, summary[metric]) for metric in METRICS)
+    result['finished'] = kernel.pcbTable.allTerminated()
+    result['seconds'] = perf_counter() - start
+    return result
+
+
+## cada worker arranca sin logs (solo warnings): las simulaciones son headless
+def setupWorker():
+    log.logger.setLevel(logging.WARNING)
+
+
+## corre todos los puntos de la grilla repartidos en un ProcessPoolExecutor (workers = None: uno por core)
+## y retorna los resultados en el orden de la grilla
+def sweep(grid = PARAMETER_GRID, workload = DEFAULT_WORKLOAD, workers = None):
+    points = gridPoints(grid)
+    with ProcessPoolExecutor(max_workers=workers, initializer=setupWorker) as executor:
+        ## en bloques, para no pagar una ida y vuelta al pool por cada simulacion
+        chunkSize = max(1, len(points) // ((workers or os.cpu_count() or 1) * 4))
+        return list(executor.map(simulate, points, repeat(workload), chunksize=chunkSize))
+
+
+## los parametros que no lee el scheduler de un punto quedan vacios
+def render(results):
+    names = dict.fromkeys(header for result in results for header in result)
+    headers = [header for header in names if header not in SCHEDULER_PARAMETERS]
+    headers[1:1] = [name for name in SCHEDULER_PARAMETERS if name in names]
+    rows = [[result.get(header) for header in headers] for result in results]
+    return tabulate(rows, headers=headers, tablefmt="grid", floatfmt=".3f")
+
+
+if __name__ == '__main__':
+    log.setupLogger(logging.WARNING)
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    workload = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_WORKLOAD
+
+    start = perf_counter()
+    results = sweep(workload=workload, workers=workers)
+    print(render(results))
+    print("{points} simulaciones en {seconds:.2f} s".format(points=len(results), seconds=perf_counter() - start))
@@ -0,0 +1,299 @@
+from hardware import *
+from so import *
+import log
+import os
+import tempfile
+import unittest
+
+
+## corre un Kernel en una maquina propia, sin esperas entre ticks, hasta que terminen todos los procesos
+def runKernel(setupKernel, eventDriven = False, cores = 1, **kernelArguments):
+    hardware = Hardware()
+    hardware.setup(32, FAST_FORWARD_CLOCK_RATE, eventDriven, cores)
+    kernel = Kernel(hardware, **kernelArguments)
+    setupKernel(kernel)
+    hardware.clock.stopCondition = kernel.hasFinished
+    hardware.switchOn()
+    hardware.clock.join()
+    return kernel
+
+
+class StatisticsTest(unittest.TestCase):
+
+    def setUp(self):
+        log.logger.setLevel(logging.WARNING)
+
+    ## el primer proceso termina mucho antes de que llegue el segundo:
+    ## las estadisticas no se tienen que cerrar en el hueco entre los dos
+    def test_jobArrivingAfterFirstWaveTerminated(self):
+        def setupKernel(kernel):
+            kernel.fileSystem.write("C:/prg.exe", Program([ASM.CPU(3)]))
+            kernel.run("C:/prg.exe", 0)
+            kernel.crontab.add_job(20, "C:/prg.exe", 0)
+
+        for eventDriven in [False, True]:
+            with self.subTest(eventDriven=eventDriven):
+                kernel = runKernel(setupKernel, eventDriven)
+                summary = kernel.statistics.summary()
+                self.assertEqual([process['arrival'] for process in summary['processes']], [0, 21])
+                self.assertTrue(all(process['turnaround'] is not None for process in summary['processes']))
+                self.assertGreater(summary['ticks'], 21)
+
+
+
+## escribe las lineas en un archivo temporal y retorna su path
+def workloadFile(testCase, lines):
+    descriptor, path = tempfile.mkstemp(suffix='.jsonl')
+    with os.fdopen(descriptor, 'w') as workload:
+        workload.write('\n'.join(lines) + '\n')
+    testCase.addCleanup(os.remove, path)
+    return path
+
+
+class ClockTest(unittest.TestCase):
+
+    def setUp(self):
+        log.logger.setLevel(logging.WARNING)
+
+    def test_fastForwardNeedsStopCondition(self):
+        with self.assertRaises(Exception):
+            Clock(FAST_FORWARD_CLOCK_RATE).start()
+
+    ## sin stopCondition, el Kernel detiene el clock cuando termina la simulacion
+    def test_kernelStopsClockByDefault(self):
+        hardware = Hardware()
+        hardware.setup(32, FAST_FORWARD_CLOCK_RATE)
+        kernel = Kernel(hardware)
+        kernel.fileSystem.write("C:/prg.exe", Program([ASM.CPU(3)]))
+        kernel.run("C:/prg.exe", 0)
+        hardware.switchOn()
+        hardware.clock.join()
+        self.assertTrue(kernel.hasFinished())
+
+class GanttDiagramTest(unittest.TestCase):
+
+    def setUp(self):
+        log.logger.setLevel(logging.WARNING)
+
+    ## con un archivo y chunks chicos, los intervalos se leen del disco y la tabla es la misma
+    def test_renderFromFileMatchesMemory(self):
+        def setupKernel(kernel):
+            kernel.fileSystem.write("C:/prg1.exe", Program([ASM.CPU(2), ASM.IO(), ASM.CPU(3), ASM.IO(), ASM.CPU(2)]))
+            kernel.fileSystem.write("C:/prg2.exe", Program([ASM.CPU(7)]))
+            kernel.run("C:/prg1.exe", 0)
+            kernel.run("C:/prg2.exe", 2)
+
+        descriptor, path = tempfile.mkstemp(suffix='.csv')
+        os.close(descriptor)
+        self.addCleanup(os.remove, path)
+
+        inMemory = runKernel(setupKernel)
+        onDisk = runKernel(setupKernel, ganttPath=path, ganttChunkSize=2)
+        self.assertGreater(os.path.getsize(path), 0)
+        self.assertEqual(onDisk.ganttDiagram.render(), inMemory.ganttDiagram.render())
+
+class WorkloadLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        log.logger.setLevel(logging.WARNING)
+
+    ## todos los procesos llegan por el Crontab, con ticks sin procesos entre uno y otro
+    def test_workloadWithIdleGap(self):
+        path = workloadFile(self, ['{"program": "C:/prg.exe", "instructions": [["CPU", 3]]}',
+                                   '{"run": "C:/prg.exe", "tick": 0}',
+                                   '{"run": "C:/prg.exe", "tick": 20}'])
+        for eventDriven in [False, True]:
+            with self.subTest(eventDriven=eventDriven):
+                kernel = runKernel(lambda kernel: WorkloadLoader(kernel).load(path), eventDriven)
+                summary = kernel.statistics.summary()
+                self.assertEqual([process['arrival'] for process in summary['processes']], [1, 21])
+                self.assertTrue(all(process['turnaround'] is not None for process in summary['processes']))
+                self.assertIn(1, {pid for pid, _, _, _ in kernel.ganttDiagram.intervals()})
+
+    def test_invalidLinesAreReportedOnLoad(self):
+        hardware = Hardware()
+        hardware.setup(32, FAST_FORWARD_CLOCK_RATE, True)
+        kernel = Kernel(hardware)
+        invalidWorkloads = {
+            'jobs must be sorted': ['{"run": "C:/prg.exe", "tick": 5}', '{"run": "C:/prg.exe", "tick": 3}'],
+            "expected a 'program' or a 'run' entry": ['{"tick": 5}'],
+            'invalid instruction': ['{"program": "C:/prg.exe", "instructions": [["JUMP", 3]]}'],
+            'Expecting': ['{"run": '],
+        }
+        for message, lines in invalidWorkloads.items():
+            with self.subTest(message=message):
+                path = workloadFile(self, ['# comentario'] + lines)
+                with self.assertRaisesRegex(ValueError, "{path}:{lineNbr}: .*{message}".format(
+                        path=path, lineNbr=len(lines) + 1, message=message)):
+                    WorkloadLoader(kernel).load(path)
+
+    ## al detenerse el Clock se cierra el archivo aunque queden jobs sin leer
+    def test_fileIsClosedWhenClockStops(self):
+        path = workloadFile(self, ['{"program": "C:/prg.exe", "instructions": [["CPU", 3]]}',
+                                   '{"run": "C:/prg.exe", "tick": 0}',
+                                   '{"run": "C:/prg.exe", "tick": 1000}'])
+        hardware = Hardware()
+        hardware.setup(32, FAST_FORWARD_CLOCK_RATE, True)
+        kernel = Kernel(hardware)
+        jobs = WorkloadLoader(kernel).jobs(path)
+        kernel.crontab.addJobs(jobs)
+        hardware.clock.stopCondition = lambda: hardware.clock.currentTick >= 10
+        hardware.switchOn()
+        hardware.clock.join()
+        self.assertFalse(kernel.crontab.hasPendingJobs())
+        self.assertIsNone(jobs.gi_frame)
+
+
+
+class IoDevicesTest(unittest.TestCase):
+
+    def setUp(self):
+        log.logger.setLevel(logging.WARNING)
+
+    ## un segundo disco conectado despues de crear el Kernel tiene su propia instruccion y su propia cola
+    def test_deviceAddedAfterKernel(self):
+        def setupKernel(kernel):
+            kernel.hardware.addIoDevice(DiskIODevice("Disk2"))
+            kernel.fileSystem.write("C:/disk.exe", Program([ASM.CPU(1), ASM.IO(DISK_DEVICE_ID), ASM.CPU(1)]))
+            kernel.fileSystem.write("C:/disk2.exe", Program([ASM.CPU(1), ASM.IO("Disk2"), ASM.CPU(1)]))
+            kernel.run("C:/disk.exe", 0)
+            kernel.run("C:/disk2.exe", 0)
+
+        kernel = runKernel(setupKernel, True)
+        self.assertTrue(kernel.pcbTable.allTerminated())
+        self.assertEqual(ASM.decode(ASM.IO("Disk2")), "IO_DISK2")
+        self.assertEqual(kernel.ioDeviceControllers[DISK_DEVICE_ID].requests, 1)
+        self.assertEqual(kernel.ioDeviceControllers["Disk2"].requests, 1)
+
+    def test_unknownDeviceIsRejectedWhenBuildingThePrograms(self):
+        with self.assertRaises(Exception):
+            Program([ASM.CPU(1), ASM.IO("Dsik")])
+        self.assertNotIn("IO_DSIK", INSTRUCTION_OPCODES)
+
+    ## el opcode de un dispositivo conectado en otra maquina: el proceso que lo usa se termina
+    ## y el resto de la simulacion sigue
+    def test_deviceMissingInThisHardware(self):
+        otherHardware = Hardware()
+        otherHardware.setup(32)
+        otherHardware.addIoDevice(DiskIODevice("OtherDisk"))
+
+        def setupKernel(kernel):
+            kernel.fileSystem.write("C:/other.exe", Program([ASM.CPU(1), ASM.IO("OtherDisk"), ASM.CPU(1)]))
+            kernel.fileSystem.write("C:/prg.exe", Program([ASM.CPU(3)]))
+            kernel.run("C:/other.exe", 0)
+            kernel.run("C:/prg.exe", 0)
+
+        with self.assertLogs(log.logger, logging.ERROR):
+            kernel = runKernel(setupKernel)
+        self.assertTrue(kernel.pcbTable.allTerminated())
+        self.assertNotIn("OtherDisk", kernel.ioDeviceControllers)
+
+    def test_deviceIdsAreUnique(self):
+        hardware = Hardware()
+        hardware.setup(32)
+        with self.assertRaises(Exception):
+            hardware.addIoDevice(DiskIODevice())
+
+
+class IoSchedulerTest(unittest.TestCase):
+
+    ## los pedidos a un mismo cilindro se atienden en orden de llegada, tambien cuando el cabezal baja
+    def test_sameCylinderInArrivalOrder(self):
+        for schedulerClass in [SstfIoScheduler, ScanIoScheduler, CLookIoScheduler]:
+            with self.subTest(scheduler=schedulerClass.__name__):
+                scheduler = schedulerClass()
+                requests = [IoRequest(None, None, position, arrival) for arrival, position in enumerate([50, 50, 150, 50])]
+                for request in requests:
+                    scheduler.add(request)
+                headPosition = 100
+                served = []
+                while len(scheduler):
+                    request = scheduler.next(headPosition)
+                    served.append(request)
+                    headPosition = request.position
+                self.assertEqual([request.arrival for request in served if request.position == 50], [0, 1, 3])
+
+class SwapTest(unittest.TestCase):
+
+    def setUp(self):
+        log.logger.setLevel(logging.WARNING)
+
+    ## con 2 frames para 2 procesos que escriben su memoria, las paginas desalojadas se guardan
+    ## en el area de swap y se vuelven a traer de ahi; el archivo se cierra al detenerse el Clock
+    def test_dirtyPagesGoThroughSwap(self):
+        hardware = Hardware()
+        hardware.setup(8, FAST_FORWARD_CLOCK_RATE, True)
+        kernel = Kernel(hardware)
+        kernel.fileSystem.write("C:/a.exe", Program([ASM.WRITE(9), ASM.IO(), ASM.WRITE(9)]))
+        kernel.fileSystem.write("C:/b.exe", Program([ASM.WRITE(11)]))
+        kernel.run("C:/a.exe", 0)
+        kernel.run("C:/b.exe", 0)
+        hardware.clock.stopCondition = kernel.hasFinished
+        hardware.switchOn()
+        hardware.clock.join()
+
+        summary = kernel.statistics.summary()
+        self.assertEqual([process['running'] for process in summary['processes']], [20, 12])
+        self.assertGreater(kernel.memoryManager.swapOuts, 0)
+        self.assertEqual(kernel.memoryManager.swapArea.usedSlots, 0)
+        self.assertFalse(kernel.memoryManager.swapArea.isOpen)
+
+    def test_swapFileIsOnlyOpenedWhenNeeded(self):
+        hardware = Hardware()
+        hardware.setup(32)
+        kernel = Kernel(hardware)
+        self.assertFalse(kernel.memoryManager.swapArea.isOpen)
+
+
+class PerCoreSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        log.logger.setLevel(logging.WARNING)
+
+    ## el balanceo pasa el menos urgente de la cola mas larga, y ese proceso conserva
+    ## el aging que junto mientras esperaba en la cola de origen
+    def test_balanceKeepsAging(self):
+        scheduler = PerCoreScheduler(SchedulerPriorityNoPreemptive, 2)
+        aged = PCB(0, "C:/aged.exe", 2, None)
+        scheduler.add(aged, 0)
+        ## una ronda de aging, sin llegar al balanceo
+        scheduler.checkTick(None, 8)
+        fresh = PCB(1, "C:/fresh.exe", 2, None)
+        scheduler.add(fresh, 1)
+        urgent = [PCB(pid, "C:/urgent.exe", 0, None) for pid in range(2, 5)]
+        for pcb in urgent:
+            scheduler.add(pcb, 0)
+
+        scheduler.checkTick(None, LOAD_BALANCE_PERIOD - 8 - 1)
+        scheduler._balance()
+
+        self.assertEqual(scheduler.metrics()['balanceMigrations'], 1)
+        self.assertEqual([scheduler.getNext(1), scheduler.getNext(1)], [aged, fresh])
+        self.assertEqual([scheduler.getNext(0) for _ in urgent], urgent)
+
+    ## el clock por eventos le pasa varios ticks juntos a checkTick: el balanceo
+    ## tiene que caer en los mismos ticks que corriendo tick a tick
+    def test_eventDrivenClockMatchesTickByTick(self):
+        programs = [
+            [ASM.CPU(9), ASM.IO(), ASM.CPU(5)],
+            [ASM.CPU(12), ASM.IO(), ASM.CPU(1), ASM.IO()],
+            [ASM.CPU(14)],
+            [ASM.CPU(4), ASM.IO(), ASM.CPU(18), ASM.CPU(9)],
+        ]
+        jobs = [(39, 0, 0, 0b01), (21, 1, 0, 0b01), (51, 2, 3, 0b01), (28, 3, 0, ALL_CORES)]
+
+        for schedulerClass in [SchedulerRoundRobin, SchedulerPriorityPreemptive]:
+            def setupKernel(kernel):
+                kernel.scheduler = PerCoreScheduler(schedulerClass, 2)
+                for index, instructions in enumerate(programs):
+                    kernel.fileSystem.write("C:/prg{index}.exe".format(index=index), Program(instructions))
+                for tickNbr, index, priority, affinity in jobs:
+                    kernel.crontab.add_job(tickNbr, "C:/prg{index}.exe".format(index=index), priority, affinity)
+
+            with self.subTest(scheduler=schedulerClass.__name__):
+                kernels = [runKernel(setupKernel, eventDriven, 2) for eventDriven in [False, True]]
+                self.assertEqual(*[kernel.ganttDiagram.render() for kernel in kernels])
+                self.assertEqual(*[kernel.scheduler.metrics() for kernel in kernels])
+
+if __name__ == '__main__':
+    unittest.main()